@@ -0,0 +1,51 @@
+# ---------------------------------------------------
+# File Name: bench_links.py
+# Description: Micro-benchmark for the Telegram link parser. The old path
+#              only pulled the username out of a link; parse_link also
+#              returns the message id, topic and kind, at about the same
+#              cost per link. It is not a speedup claim.
+# Usage: python benchmarks/bench_links.py
+# ---------------------------------------------------
+
+import importlib.util
+import os
+import re
+import timeit
+
+# Load the parser straight from its file so the bot clients are not started
+_path = os.path.join(os.path.dirname(__file__), "..", "devgagan", "core", "links.py")
+_spec = importlib.util.spec_from_file_location("links", _path)
+links = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(links)
+
+SAMPLES = [
+    "https://t.me/save_restricted_botss/796",
+    "https://t.me/c/1234567890/42?single",
+    "https://t.me/c/1234567890/7/42",
+    "https://t.me/somechannel/12/345?thread=12",
+    "https://t.me/someuser/s/3",
+    "https://t.me/+AbCdEfGhIjK",
+    "tg://openmessage?user_id=123456&message_id=77",
+]
+BATCH = "\n".join(SAMPLES * 20)
+
+OLD_REGEX = r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»""'']))"
+
+
+def old_parse(text):
+    urls = re.findall(OLD_REGEX, text)
+    link = urls[0][0] if urls else None
+    return link.split('t.me/')[1].split('/')[0].split('?')[0] if link else None
+
+
+def main():
+    number = 20000
+    for name, func in (("old regex + split", old_parse), ("parse_link", links.parse_link)):
+        total = timeit.timeit(lambda: [func(s) for s in SAMPLES], number=number)
+        print(f"{name:<20} {total / (number * len(SAMPLES)) * 1e6:8.3f} us/link")
+    total = timeit.timeit(lambda: links.parse_links(BATCH), number=200)
+    print(f"{'parse_links batch':<20} {total / (200 * len(SAMPLES) * 20) * 1e6:8.3f} us/link")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,3 +17,14 @@ AD_API = getenv("AD_API", "52b4a2cf4687d81e7d3f8f2b7bc2943f618e78cb")
 STRING = getenv("STRING", None)
 YT_COOKIES = getenv("YT_COOKIES", None)
 INSTA_COOKIES = getenv("INSTA_COOKIES", None)
+SCRATCH_DIR = getenv("SCRATCH_DIR", "scratch")
+SCRATCH_QUOTA_MB = int(getenv("SCRATCH_QUOTA_MB", "20480"))
+USER_SCRATCH_QUOTA_MB = int(getenv("USER_SCRATCH_QUOTA_MB", "4608"))
+SCRATCH_RESERVE_MB = int(getenv("SCRATCH_RESERVE_MB", "512"))
+SCRATCH_MAX_AGE = int(getenv("SCRATCH_MAX_AGE", "21600"))
+DRAIN_TIMEOUT = int(getenv("DRAIN_TIMEOUT", "300"))
+HELPER_BOT_TOKENS = getenv("HELPER_BOT_TOKENS", "").split()
+MEMORY_TRANSFER_MB = int(getenv("MEMORY_TRANSFER_MB", "10"))
+LOG_LEVEL = getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = getenv("LOG_FORMAT", "json")
+LOG_RATE = float(getenv("LOG_RATE", "20"))
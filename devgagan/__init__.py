@@ -16,17 +16,17 @@ import asyncio
 import logging
 from pyrogram import Client
 from pyrogram.enums import ParseMode 
-from config import API_ID, API_HASH, BOT_TOKEN, STRING, MONGO_DB
+from config import API_ID, API_HASH, BOT_TOKEN, STRING, MONGO_DB, HELPER_BOT_TOKENS
 from telethon.sync import TelegramClient
 from motor.motor_asyncio import AsyncIOMotorClient
+from devgagan.core.governor import govern, govern_telethon
+from devgagan.core.logs import setup_logging
+from devgagan.core.mongo import peers_db
 import time
 
 loop = asyncio.get_event_loop()
 
-logging.basicConfig(
-    format="[%(levelname) 5s/%(asctime)s] %(name)s: %(message)s",
-    level=logging.INFO,
-)
+setup_logging()
 
 botStartTime = time.time()
 
@@ -39,10 +39,33 @@ app = Client(
     parse_mode=ParseMode.MARKDOWN
 )
 
-pro = Client("ggbot", api_id=API_ID, api_hash=API_HASH, session_string=STRING)
+# STRING may hold several session strings separated by whitespace
+pros = [
+    Client("ggbot" if index == 0 else f"ggbot{index}", api_id=API_ID, api_hash=API_HASH, session_string=session)
+    for index, session in enumerate(STRING.split() if STRING else [])
+]
+pro = pros[0] if pros else Client("ggbot", api_id=API_ID, api_hash=API_HASH, session_string=STRING)
+
+# Extra bot tokens that only upload; the primary bot delivers their files
+helpers = [
+    Client(
+        f":HelperBot{index}:",
+        api_id=API_ID,
+        api_hash=API_HASH,
+        bot_token=helper_token,
+        no_updates=True,
+        parse_mode=ParseMode.MARKDOWN
+    )
+    for index, helper_token in enumerate(HELPER_BOT_TOKENS)
+]
 
 sex = TelegramClient('sexrepo', API_ID, API_HASH).start(bot_token=BOT_TOKEN)
 
+# Every client shares the same rate governor, so status edits cannot starve deliveries
+for client in (app, *(pros or [pro]), *helpers):
+    govern(client)
+govern_telethon(sex, "sexrepo")
+
 
 # MongoDB setup
 tclient = AsyncIOMotorClient(MONGO_DB)
@@ -56,12 +79,13 @@ async def create_ttl_index():
 # Run the TTL index creation when the bot starts
 async def setup_database():
     await create_ttl_index()
+    await peers_db.create_indexes()
     print("MongoDB TTL index created.")
 
 # You can call this in your main bot file before starting the bot
 
 async def restrict_bot():
-    global BOT_ID, BOT_NAME, BOT_USERNAME
+    global BOT_ID, BOT_NAME, BOT_USERNAME, pro
     await setup_database()
     await app.start()
     getme = await app.get_me()
@@ -71,7 +95,21 @@ async def restrict_bot():
         BOT_NAME = getme.first_name + " " + getme.last_name
     else:
         BOT_NAME = getme.first_name
-    if STRING:
-        await pro.start()
+    for session in list(pros):
+        try:
+            await session.start()
+        except Exception as e:
+            # Leave dead sessions out of the pool instead of failing the boot
+            pros.remove(session)
+            logging.getLogger(__name__).error(f"Could not start session {session.name}: {e}")
+    # `pro` must not keep pointing at a session that failed to start
+    pro = pros[0] if pros else None
+    for helper in list(helpers):
+        try:
+            await helper.start()
+        except Exception as e:
+            # A revoked or mistyped helper token only costs that helper
+            helpers.remove(helper)
+            logging.getLogger(__name__).error(f"Could not start helper bot {helper.name}: {e}")
 
 loop.run_until_complete(restrict_bot())
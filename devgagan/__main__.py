@@ -14,15 +14,18 @@
 
 import asyncio
 import importlib
-import gc
 from pyrogram import idle
 from devgagan.modules import ALL_MODULES
 from devgagan.core.mongo.plans_db import check_and_remove_expired_users
+from devgagan.core.scratch import scratch
+from devgagan.core.state import sweep_all
 from aiojobs import create_scheduler
 
 # ----------------------------Bot-Start---------------------------- #
 
 loop = asyncio.get_event_loop()
+# Background tasks, referenced so they are not garbage collected mid-run
+background_tasks = set()
 
 # Function to schedule expiry checks
 async def schedule_expiry_check():
@@ -30,9 +33,12 @@ async def schedule_expiry_check():
     while True:
         await scheduler.spawn(check_and_remove_expired_users())
         await asyncio.sleep(60)  # Check every hour
-        gc.collect()
+        scratch.sweep()
+        sweep_all()
 
 async def devggn_boot():
+    # Nothing is in flight yet, so anything left in scratch is an orphan
+    scratch.sweep(max_age=0)
     for all_module in ALL_MODULES:
         importlib.import_module("devgagan.modules." + all_module)
     print("""
@@ -51,8 +57,10 @@ async def devggn_boot():
 ---------------------------------------------------
 """)
 
-    asyncio.create_task(schedule_expiry_check())
+    background_tasks.add(asyncio.create_task(schedule_expiry_check()))
     print("Auto removal started ...")
+    from devgagan.modules.main import resume_journaled_jobs
+    background_tasks.add(asyncio.create_task(resume_journaled_jobs()))
     await idle()
     print("Bot stopped...")
 
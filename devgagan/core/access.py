@@ -0,0 +1,89 @@
+# ---------------------------------------------------
+# File Name: access.py
+# Description: Cached access decisions (premium, token, cooldown) per user
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import logging
+from datetime import datetime
+from config import OWNER_ID
+from devgagan import token
+from devgagan.core.func import chk_user
+from devgagan.core.state import TTLMap, CACHE_MAXSIZE
+
+logger = logging.getLogger(__name__)
+
+# Seconds premium and token lookups stay cached before Mongo is asked again
+ACCESS_CACHE_TTL = 60
+
+# user_id -> verified_until or None
+_token_cache = TTLMap(ttl=ACCESS_CACHE_TTL, maxsize=CACHE_MAXSIZE)
+# user_id -> (premium, verified_until)
+_access_cache = TTLMap(ttl=ACCESS_CACHE_TTL, maxsize=CACHE_MAXSIZE)
+_MISSING = object()
+
+
+class AccessDecision:
+    """Access state of a user, resolved once per request"""
+
+    __slots__ = ("user_id", "premium", "verified_until", "cooldown_until")
+
+    def __init__(self, user_id, premium, verified_until=None, cooldown_until=None):
+        self.user_id = user_id
+        self.premium = premium
+        self.verified_until = verified_until
+        self.cooldown_until = cooldown_until
+
+    @property
+    def owner(self):
+        return self.user_id in OWNER_ID
+
+    @property
+    def verified(self):
+        return self.verified_until is not None and datetime.utcnow() < self.verified_until
+
+    @property
+    def freecheck(self):
+        """Same value `chk_user` returns: 0 for premium/owner, 1 for free users"""
+        return 0 if self.premium else 1
+
+
+async def get_verified_until(user_id):
+    """Return the expiry of the user's active token, or None"""
+    verified_until = _token_cache.get(user_id, _MISSING)
+    if verified_until is _MISSING:
+        try:
+            session = await token.find_one({"user_id": user_id})
+        except Exception as e:
+            logger.error(f"Error loading token for {user_id}: {e}")
+            return None
+        verified_until = session.get("expires_at") if session else None
+        _token_cache[user_id] = verified_until
+
+    # Tokens expire in Mongo via the TTL index; expire the cached copy too
+    if verified_until is not None and datetime.utcnow() >= verified_until:
+        _token_cache.pop(user_id, None)
+        return None
+    return verified_until
+
+
+def invalidate_access(user_id):
+    """Drop cached access state, call after a token or premium plan changes"""
+    _token_cache.pop(user_id, None)
+    _access_cache.pop(user_id, None)
+
+
+async def get_access(user_id, cooldowns=None):
+    """Build the access decision for a user, reading Mongo at most once per TTL"""
+    cached = _access_cache.get(user_id)
+    if cached is None:
+        premium = await chk_user(None, user_id) == 0
+        verified_until = None if premium else await get_verified_until(user_id)
+        cached = _access_cache[user_id] = (premium, verified_until)
+    premium, verified_until = cached
+    # Cooldowns live in memory and change per request, so they are never cached
+    cooldown_until = cooldowns.get(user_id) if cooldowns is not None else None
+    return AccessDecision(user_id, premium, verified_until, cooldown_until)
@@ -0,0 +1,44 @@
+# ---------------------------------------------------
+# File Name: caption.py
+# Description: Compiled caption delete and replace rules
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import re
+
+__all__ = [
+    'CaptionRules',
+    'compile_caption_rules',
+]
+
+class CaptionRules:
+    """A user's delete and replace words compiled into one matcher"""
+
+    __slots__ = ("pattern", "table")
+
+    def __init__(self, pattern, table):
+        self.pattern = pattern
+        self.table = table
+
+    def apply(self, caption):
+        if not caption or self.pattern is None:
+            return caption
+        table = self.table
+        return self.pattern.sub(lambda m: table[m.group(0)], caption)
+
+
+def compile_caption_rules(delete_words, replacement_words):
+    """Build a CaptionRules from the stored delete set and replacement map"""
+    table = {word: ' ' for word in delete_words or () if word}
+    for word, replacement in (replacement_words or {}).items():
+        if word:
+            table[word] = replacement
+    if not table:
+        return CaptionRules(None, table)
+    # Longest first so overlapping words prefer the most specific rule
+    words = sorted(table, key=len, reverse=True)
+    pattern = re.compile("|".join(map(re.escape, words)))
+    return CaptionRules(pattern, table)
@@ -0,0 +1,105 @@
+# ---------------------------------------------------
+# File Name: delivery.py
+# Description: Upload once, then copy by file_id to every destination
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import logging
+from pyrogram.errors import FloodWait
+from devgagan import app
+from devgagan.core.mongo.db import get_data
+from devgagan.core.state import TTLMap, CACHE_MAXSIZE
+from config import LOG_GROUP
+
+logger = logging.getLogger(__name__)
+
+# Seconds a user's configured channel is cached
+TARGETS_TTL = 60
+# FloodWaits a single copy sits out before giving up
+COPY_RETRIES = 3
+# Log-group copies waiting for the background worker; extra ones are dropped
+LOG_QUEUE_SIZE = 1000
+
+# user_id -> [chat ids]
+_targets = TTLMap(ttl=TARGETS_TTL, maxsize=CACHE_MAXSIZE)
+_log_queue = None
+_log_worker = None
+
+
+async def user_targets(user_id):
+    """Chats the user asked to receive copies in, besides their own DM"""
+    cached = _targets.get(user_id)
+    if cached is not None:
+        return cached
+    data = await get_data(user_id)
+    chat_id = data.get("chat_id") if data else None
+    targets = [int(chat_id)] if chat_id and int(chat_id) != user_id else []
+    _targets[user_id] = targets
+    return targets
+
+
+def invalidate_targets(user_id):
+    """Forget the cached targets once the user changes their channel"""
+    _targets.pop(user_id, None)
+
+
+async def _copy(target, sent):
+    """Copy an already uploaded message (or album) to `target` without re-uploading"""
+    for attempt in range(COPY_RETRIES + 1):
+        try:
+            if isinstance(sent, list):
+                return await app.copy_media_group(target, sent[0].chat.id, sent[0].id)
+            return await app.copy_message(target, sent.chat.id, sent.id)
+        except FloodWait as e:
+            if attempt == COPY_RETRIES:
+                raise
+            await asyncio.sleep(e.value)
+
+
+async def _drain_log_queue():
+    while True:
+        sent = await _log_queue.get()
+        try:
+            await _copy(LOG_GROUP, sent)
+        except Exception as e:
+            logger.error(f"Log group copy failed: {e}")
+        finally:
+            _log_queue.task_done()
+
+
+def copy_to_log_group(sent):
+    """Queue a copy for LOG_GROUP so it never delays the user's delivery"""
+    global _log_queue, _log_worker
+    if not LOG_GROUP or not sent:
+        return
+    first = sent[0] if isinstance(sent, list) else sent
+    if first.chat.id == LOG_GROUP:
+        return
+    if _log_queue is None:
+        _log_queue = asyncio.Queue(LOG_QUEUE_SIZE)
+    if _log_worker is None or _log_worker.done():
+        _log_worker = asyncio.create_task(_drain_log_queue())
+    try:
+        _log_queue.put_nowait(sent)
+    except asyncio.QueueFull:
+        logger.warning("Log group queue is full, dropping a copy")
+
+
+async def deliver(sent, user_id):
+    """Fan an uploaded message out to the user and their channels at once and queue the log copy"""
+    if not sent:
+        return sent
+    first = sent[0] if isinstance(sent, list) else sent
+    # Staged uploads (helper bots, Premium sessions) still have to reach the user
+    targets = ([user_id] if first.chat.id != user_id else []) + await user_targets(user_id)
+    if targets:
+        results = await asyncio.gather(*(_copy(target, sent) for target in targets), return_exceptions=True)
+        for target, result in zip(targets, results):
+            if isinstance(result, Exception):
+                logger.error(f"Copy to {target} for {user_id} failed: {result}")
+    copy_to_log_group(sent)
+    return sent
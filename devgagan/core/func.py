@@ -33,7 +33,13 @@ from datetime import datetime as dt
 from pyrogram import enums
 from pyrogram.enums import ParseMode
 from config import CHANNEL_ID, OWNER_ID 
-from devgagan.core.mongo.plans_db import premium_users
+from devgagan.core.mongo.plans_db import check_premium
+from devgagan.core.links import parse_link, PRIVATE, USER, INVITE
+from devgagan.core.upload import send_document_resumable
+from devgagan.core.journal import journal
+from devgagan.core.delivery import deliver
+from devgagan.core.status import StatusMessage
+from devgagan.core.scratch import scratch
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from pyrogram.errors import (
     FloodWait, 
@@ -47,6 +53,7 @@ logger = logging.getLogger(__name__)
 
 # Constants
 SIZE_LIMIT = 2 * 1024 * 1024 * 1024  # 2GB
+PREMIUM_SIZE_LIMIT = 4000 * 1024 * 1024  # 8000 parts of 512KB for Premium accounts
 PROGRESS_BAR = """
 │ **__Completed:__** {1}/{2}
 │ **__Bytes:__** {0}%
@@ -55,12 +62,13 @@ PROGRESS_BAR = """
 ╰─────────────────────╯
 """
 
+URL_REGEX = re.compile(r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»""'']))")
+
 last_update_time = time.time()
 
 async def chk_user(message, user_id):
     """Check if user is premium or owner"""
-    user = await premium_users()
-    if user_id in user or user_id in OWNER_ID:
+    if user_id in OWNER_ID or await check_premium(user_id):
         return 0
     return 1
 
@@ -229,10 +237,9 @@ async def get_link(text, message=None):
             return None
     else:
         # URL extraction functionality
-        regex = r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»""'']))"
         try:
-            urls = re.findall(regex, text)
-            return urls[0][0] if urls else False
+            match = URL_REGEX.search(text)
+            return match.group(1) if match else False
         except Exception:
             return False
 
@@ -264,7 +271,10 @@ async def screenshot(video_path, duration, user_id):
             return None
             
         timestamp = duration // 2
-        thumbnail_path = f"thumb_{user_id}_{int(time.time())}.jpg"
+        thumbnail_path = os.path.join(
+            os.path.dirname(os.path.abspath(video_path)),
+            f"thumb_{user_id}_{int(time.time())}.jpg"
+        )
         
         cap = cv2.VideoCapture(video_path)
         cap.set(cv2.CAP_PROP_POS_FRAMES, timestamp * cap.get(cv2.CAP_PROP_FPS))
@@ -284,10 +294,12 @@ async def screenshot(video_path, duration, user_id):
 
 async def progress_callback(current, total, ud_type, message, start):
     """Progress callback for uploads/downloads"""
+    journal.progress(current, total)
     try:
         now = time.time()
         diff = now - start
-        if round(diff % 10.00) == 0 or current == total:
+        # Status messages coalesce edits themselves; raw messages are throttled here
+        if isinstance(message, StatusMessage) or round(diff % 10.00) == 0 or current == total:
             percentage = current * 100 / total
             speed = current / diff
             elapsed_time = round(diff) * 1000
@@ -324,21 +336,21 @@ async def prog_bar(current, total, ud_type, message, start):
 
 async def split_and_upload_file(app, sender, file, caption):
     """Split large files and upload them in parts"""
+    status = None
     try:
         if not os.path.exists(file):
             await app.send_message(sender, "❌ File not found!")
             return
 
         file_size = os.path.getsize(file)
-        start = await app.send_message(
-            sender, 
-            f"ℹ️ File size: {file_size / (1024 * 1024):.2f} MB"
-        )
+        status = StatusMessage(app, sender)
+        await status.edit(f"ℹ️ File size: {file_size / (1024 * 1024):.2f} MB")
         
         # Set part size to slightly less than 2GB to be safe
         PART_SIZE = 1.9 * 1024 * 1024 * 1024
 
         part_number = 0
+        job = scratch.owner(file)
         async with aiofiles.open(file, mode="rb") as f:
             while True:
                 chunk = await f.read(int(PART_SIZE))
@@ -350,77 +362,77 @@ async def split_and_upload_file(app, sender, file, caption):
                 part_file = f"{base_name}.part{str(part_number).zfill(3)}{file_ext}"
 
                 # Write part to file
+                # Parts sit next to the file, so they count against its scratch job
+                scratch.grow(job, len(chunk))
                 async with aiofiles.open(part_file, mode="wb") as part_f:
                     await part_f.write(chunk)
 
                 # Upload part
-                edit = await app.send_message(
-                    sender, 
-                    f"⬆️ Uploading part {part_number + 1}..."
-                )
+                await status.edit(f"⬆️ Uploading part {part_number + 1}...")
                 
                 part_caption = f"{caption}\n\n**Part : {part_number + 1}**"
                 
                 try:
-                    await app.send_document(
+                    sent = await send_document_resumable(
+                        app,
                         sender,
-                        document=part_file,
+                        part_file,
                         caption=part_caption,
                         parse_mode=ParseMode.MARKDOWN,
                         progress=progress_callback,
                         progress_args=(
                             "╭─────────────────────╮\n│ **__Pyro Uploader__**\n├─────────────────────",
-                            edit,
+                            status,
                             time.time()
                         )
                     )
+                    await deliver(sent, sender)
                 except Exception as e:
                     logger.error(f"Error uploading part {part_number + 1}: {e}")
-                    await edit.edit(f"❌ Error uploading part {part_number + 1}: {str(e)}")
+                    journal.fail(e)
+                    await status.finish(f"❌ Error uploading part {part_number + 1}: {str(e)}")
                     return
                 finally:
-                    await edit.delete()
                     if os.path.exists(part_file):
                         os.remove(part_file)
+                    scratch.shrink(job, len(chunk))
 
                 part_number += 1
 
-        await start.delete()
-        
     except Exception as e:
         logger.error(f"Error in split_and_upload_file: {e}")
+        journal.fail(e)
         await app.send_message(sender, f"❌ Error processing file: {str(e)}")
     finally:
+        if status:
+            await status.delete()
         if os.path.exists(file):
             os.remove(file)
 
 async def get_chat_id(app, chat_link):
-    """Get chat ID from a channel username or invite link"""
+    """Get chat ID from a parsed link, channel username or invite link"""
     try:
-        # Handle t.me links
-        if 't.me/' in chat_link:
-            username = chat_link.split('t.me/')[1].split('/')[0]
-        else:
-            username = chat_link.split('/')[-1]
-            
-        # Remove any trailing message ID
-        username = username.split('?')[0]
-        
-        try:
-            # Try getting chat info
-            chat = await app.get_chat(username)
-            return chat.id, None
-        except Exception as e:
-            # If username lookup fails, try joining if it's a private channel
+        link = parse_link(chat_link) if isinstance(chat_link, str) else chat_link
+        if not link:
+            return None, "Invalid Telegram link"
+
+        # Numeric ids from t.me/c/ and tg:// links need no lookup
+        if link.kind in (PRIVATE, USER):
+            return link.chat_ref, None
+
+        if link.kind == INVITE:
             try:
-                if 'joinchat' in chat_link or '+' in chat_link:
-                    await app.join_chat(chat_link)
-                    chat = await app.get_chat(chat_link)
-                    return chat.id, None
+                await app.join_chat(link.url)
+                chat = await app.get_chat(link.url)
+                return chat.id, None
             except Exception as join_error:
                 return None, f"Failed to join chat: {str(join_error)}"
-                
+
+        try:
+            chat = await app.get_chat(link.chat_ref)
+            return chat.id, None
+        except Exception as e:
             return None, f"Could not find chat: {str(e)}"
-            
+
     except Exception as e:
         return None, f"Error processing link: {str(e)}"
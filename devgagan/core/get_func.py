@@ -9,28 +9,39 @@
 
 import asyncio
 import time
-import gc
 import os
-import re
 import logging
 from typing import Callable
-from devgagan import app
+from devgagan import app, helpers
 import aiofiles
 from devgagan import sex as gf
 from telethon.tl.types import DocumentAttributeVideo, Message
 from telethon.sessions import StringSession
 import pymongo
-from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from pyrogram import raw, types, utils
+from pyrogram.file_id import FileId
+from pyrogram.types import (
+    InlineKeyboardMarkup,
+    InlineKeyboardButton,
+    InputMediaAudio,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo
+)
 from pyrogram.errors import (
     ChannelBanned, 
     ChannelInvalid, 
     ChannelPrivate, 
     ChatIdInvalid, 
     ChatInvalid,
+    ChatForwardsRestricted,
     FloodWait,
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    PeerIdInvalid,
     RPCError
 )
-from pyrogram.enums import MessageMediaType, ParseMode
+from pyrogram.enums import MessageMediaType, MessagesFilter, ParseMode
 from devgagan.core.func import (
     chk_user,
     subscribe,
@@ -38,17 +49,32 @@ from devgagan.core.func import (
     progress_callback,
     get_chat_id,
     split_and_upload_file,
-    video_metadata
+    userbot_join,
+    video_metadata,
+    PREMIUM_SIZE_LIMIT
 )
+from devgagan.core.links import parse_link, PUBLIC, STORY, INVITE
+from devgagan.core.caption import compile_caption_rules
+from devgagan.core.scratch import scratch, ScratchFull
+from devgagan.core.resume import resumable_download
+from devgagan.core.upload import send_document_resumable, send_video_resumable
+from devgagan.core.singleflight import transfers
+from devgagan.core.pool import ClientPool
+from devgagan.core.delivery import deliver
+from devgagan.core.retry import retry, classify, CircuitOpen, PERMANENT
+from devgagan.core.state import TTLMap, TTLSet, CACHE_MAXSIZE
+from devgagan.core.journal import journal
 from config import (
     MONGO_DB as MONGODB_CONNECTION_STRING,
     LOG_GROUP,
     OWNER_ID,
     STRING,
     API_ID,
-    API_HASH
+    API_HASH,
+    MEMORY_TRANSFER_MB
 )
 from devgagan.core.mongo import db as odb
+from devgagan.core.mongo.stories_db import delivered_stories, mark_delivered
 from telethon import TelegramClient, events, Button
 from devgagantools import fast_upload
 
@@ -58,6 +84,23 @@ logger = logging.getLogger(__name__)
 VIDEO_EXTENSIONS = ['mp4', 'mov', 'avi', 'mkv', 'flv', 'wmv', 'webm', 'mpg', 'mpeg', '3gp', 'ts', 'm4v', 'f4v', 'vob']
 DOCUMENT_EXTENSIONS = ['pdf', 'docs']
 SIZE_LIMIT = 2 * 1024 * 1024 * 1024  # 2GB
+MEMORY_TRANSFER_LIMIT = MEMORY_TRANSFER_MB * 1024 * 1024
+ALBUM_WORKERS = 4
+ALBUM_TTL = 600
+PREFERENCE_TTL = 7 * 24 * 3600
+STORY_WORKERS = 4
+STORY_IDS_PER_REQUEST = 100
+# Media kinds /filter can ask Telegram for
+SEARCH_FILTERS = {
+    "video": MessagesFilter.VIDEO,
+    "photo": MessagesFilter.PHOTO,
+    "media": MessagesFilter.PHOTO_VIDEO,
+    "document": MessagesFilter.DOCUMENT,
+    "pdf": MessagesFilter.DOCUMENT,
+    "audio": MessagesFilter.AUDIO,
+    "voice": MessagesFilter.VOICE_NOTE,
+    "gif": MessagesFilter.ANIMATION
+}
 
 # MongoDB setup
 DB_NAME = "smart_users"
@@ -66,18 +109,34 @@ mongo_app = pymongo.MongoClient(MONGODB_CONNECTION_STRING)
 db = mongo_app[DB_NAME]
 sessions_collection = db[COLLECTION_NAME]
 
-# Initialize pro client if STRING is available
+# Upload capacity: the primary bot plus any helper bots staging through LOG_GROUP
+upload_bots = ClientPool([("primary", app)])
+if LOG_GROUP:
+    for index, helper in enumerate(helpers):
+        upload_bots.add(helper, f"helper{index}")
+
+# Initialize pro clients if STRING is available
 if STRING:
-    from devgagan import pro
-    logger.info("Pro client initialized successfully")
+    from devgagan import pros
+    logger.info(f"{len(pros)} pro session(s) initialized successfully")
 else:
-    pro = None
+    pros = []
     logger.warning("STRING not available, pro client disabled")
 
-# User storage
-user_chat_ids = {}
-user_rename_preferences = {}
-user_caption_preferences = {}
+# Owner sessions that fetch public content, picked by load and FloodWait state
+fetch_sessions = ClientPool((session.name, session) for session in pros)
+
+# User storage, forgotten after a week without use
+user_chat_ids = TTLMap(ttl=PREFERENCE_TTL, sliding=True)
+user_rename_preferences = TTLMap(ttl=PREFERENCE_TTL, sliding=True)
+user_caption_preferences = TTLMap(ttl=PREFERENCE_TTL, sliding=True)
+caption_rules_cache = TTLMap(ttl=3600, maxsize=CACHE_MAXSIZE)
+# Chats re-probed for server-side copies every few hours, rights change
+no_server_copy_chats = TTLSet(ttl=6 * 3600, maxsize=CACHE_MAXSIZE)
+# (user, chat, media_group_id) of albums sent recently
+delivered_albums = TTLMap(ttl=ALBUM_TTL, maxsize=CACHE_MAXSIZE)
+# Session name -> whether it can post in LOG_GROUP
+log_group_access = TTLMap(ttl=3600, maxsize=CACHE_MAXSIZE)
 
 def thumbnail(sender):
     """Get thumbnail path for a sender"""
@@ -88,137 +147,509 @@ async def fetch_upload_method(user_id):
     user_data = sessions_collection.find_one({"user_id": user_id})
     return user_data.get("upload_method", "Pyrogram") if user_data else "Pyrogram"
 
-async def format_caption_to_html(caption: str) -> str:
-    """Convert markdown-style formatting to HTML"""
+def get_caption_rules(user_id):
+    """Load the user's compiled delete/replace rules, cached until they change"""
+    rules = caption_rules_cache.get(user_id)
+    if rules is None:
+        try:
+            user_data = sessions_collection.find_one(
+                {"_id": user_id}, {"delete_words": 1, "replacement_words": 1}
+            ) or {}
+        except Exception as e:
+            logger.error(f"Error loading caption rules: {e}")
+            user_data = {}
+        rules = compile_caption_rules(user_data.get("delete_words"), user_data.get("replacement_words"))
+        caption_rules_cache[user_id] = rules
+    return rules
+
+def apply_caption_rules(user_id, caption):
+    """Apply the user's delete and replace words to a caption"""
     if not caption:
-        return None
-        
-    caption = re.sub(r"^> (.*)", r"<blockquote>\1</blockquote>", caption, flags=re.MULTILINE)
-    caption = re.sub(r"```(.*?)```", r"<pre>\1</pre>", caption, flags=re.DOTALL)
-    caption = re.sub(r"`(.*?)`", r"<code>\1</code>", caption)
-    caption = re.sub(r"\*\*(.*?)\*\*", r"<b>\1</b>", caption)
-    caption = re.sub(r"\*(.*?)\*", r"<b>\1</b>", caption)
-    caption = re.sub(r"__(.*?)__", r"<i>\1</i>", caption)
-    caption = re.sub(r"_(.*?)_", r"<i>\1</i>", caption)
-    caption = re.sub(r"~~(.*?)~~", r"<s>\1</s>", caption)
-    caption = re.sub(r"\|\|(.*?)\|\|", r"<details>\1</details>", caption)
-    caption = re.sub(r"\[(.*?)\]\((.*?)\)", r'<a href="\2">\1</a>', caption)
-    
-    return caption.strip()
-
-async def get_msg(userbot, user_id, msg_id, link, retry_count=0, message=None):
-    """Process and handle message from link"""
-    try:
-        # Get chat ID
-        chat_id, error = await get_chat_id(userbot, link)
-        if error:
-            await message.reply(f"❌ {error}")
+        return caption
+    return get_caption_rules(user_id).apply(caption)
+
+async def get_msg(userbot, user_id, status, link, message=None):
+    """Process and handle message from link; returns whether it was delivered"""
+    if isinstance(link, str):
+        link = parse_link(link)
+    if link and link.kind == INVITE:
+        # Invite links join the user's account to the chat so its messages can be fetched
+        if not userbot:
+            journal.fail("not logged in")
+            await message.reply("❌ Please /login first to join this chat.")
+            return False
+        await message.reply(await userbot_join(userbot, link.url))
+        return True
+    if not link or not link.message_id:
+        journal.fail("invalid link")
+        await message.reply("❌ Invalid Telegram link")
+        return False
+
+    edit = status
+
+    # Public content goes through the owner session pool, the rest needs the user's login
+    pooled = link.kind in (PUBLIC, STORY) and bool(fetch_sessions.healthy)
+    if not pooled and not userbot:
+        journal.fail("not logged in")
+        await message.reply("❌ Please /login first to access this chat.")
+        return False
+
+    # Chat ids already resolved per client, so retries do not resolve again
+    resolved = {}
+
+    async def route(client):
+        if link.kind == STORY:
+            await download_user_stories(client, link.chat_ref, link.message_id, edit, user_id)
             return
+        if client not in resolved:
+            chat_id, error = await get_chat_id(client, link)
+            if error:
+                journal.fail(error)
+                await message.reply(f"❌ {error}")
+                return
+            resolved[client] = chat_id
+        await copy_message_with_chat_id(app, client, user_id, resolved[client], link.message_id, edit)
 
-        # Process message
-        await process_message(userbot, chat_id, msg_id, user_id, message)
-        
+    async def attempt():
+        if pooled:
+            async with fetch_sessions.acquire() as session:
+                await route(session)
+        else:
+            await route(userbot)
+
+    try:
+        await retry(attempt, key=("chat", link.chat_ref), failover=pooled)
+    except CircuitOpen as e:
+        journal.fail(e)
+        await edit.finish(f"❌ This chat keeps failing, skipping it for {int(e.remaining)}s.")
     except Exception as e:
         logger.error(f"Error in get_msg: {e}")
-        if retry_count < 3:
-            await asyncio.sleep(2)
-            return await get_msg(userbot, user_id, msg_id, link, retry_count + 1, message)
+        journal.fail(e)
         await message.reply(f"❌ Failed to process message: {str(e)}")
+    # Every failure on the way records itself in the journal
+    return not journal.failed()
 
 async def copy_message_with_chat_id(app, userbot, sender, chat_id, message_id, edit):
     """Copy message between chats with proper handling"""
     try:
         msg = await userbot.get_messages(chat_id, message_id)
         if not msg or msg.service or msg.empty:
-            await edit.edit("❌ Invalid message or empty content")
+            await edit.finish("❌ Invalid message or empty content")
             return
 
         # Handle different message types
         if msg.web_page:
-            await clone_message(app, msg, sender, None, edit.id, LOG_GROUP)
+            await clone_message(app, msg, sender, None, edit, LOG_GROUP)
             return
 
         if msg.text:
-            await clone_text_message(app, msg, sender, None, edit.id, LOG_GROUP)
+            await clone_text_message(app, msg, sender, None, edit, LOG_GROUP)
             return
 
         # Handle media messages
+        if msg.media_group_id and await copy_media_group(app, userbot, sender, msg, edit):
+            return
+
         if msg.media:
-            file = await download_and_process_media(userbot, msg, edit)
-            if not file:
+            if await server_side_copy(app, msg, sender):
+                await edit.delete()
                 return
 
-            try:
-                await upload_processed_media(app, msg, file, sender, edit)
-            finally:
-                if os.path.exists(file):
-                    os.remove(file)
+            async def transfer():
+                if 0 < media_size(msg) <= MEMORY_TRANSFER_LIMIT:
+                    return await transfer_in_memory(app, userbot, msg, sender, edit)
+                try:
+                    job = scratch.admit(sender, media_size(msg))
+                except ScratchFull as e:
+                    journal.fail(e)
+                    await edit.finish(f"❌ {e}")
+                    return None
+
+                try:
+                    file = await download_and_process_media(userbot, msg, edit, job)
+                    if not file:
+                        return None
+                    return await upload_processed_media(app, userbot, msg, file, sender, edit, job)
+                finally:
+                    scratch.release(job)
+
+            # Users with a custom thumbnail get their own upload; captions are
+            # rewritten per user on the copy. Files split over 2GB are not
+            # shared (the leader returns None), so followers transfer them again.
+            key = (msg.chat.id, msg.id, thumbnail(sender))
+            if transfers.in_flight(key):
+                await edit.edit("⏳ This file is already being fetched for another user, you will get it as soon as it lands.")
+            result, leader = await transfers.do(key, transfer)
+
+            if not leader:
+                # Reuse the uploaded file by id, or fetch it ourselves if the leader failed
+                copied = None
+                if result is not None:
+                    try:
+                        # An empty caption, not None, so the leader's caption is not kept
+                        copied = await app.copy_message(
+                            sender, result.chat.id, result.id,
+                            caption=apply_caption_rules(sender, msg.caption) or ""
+                        )
+                    except FloodWait:
+                        raise
+                    except RPCError as e:
+                        # e.g. the leader's message was deleted meanwhile
+                        logger.info(f"Shared upload {result.chat.id}/{result.id} unusable, transferring again: {e}")
+                if copied is not None:
+                    await deliver(copied, sender)
+                    await edit.delete()
+                else:
+                    await transfer()
         else:
-            await edit.edit("❌ Unsupported message type")
+            await edit.finish("❌ Unsupported message type")
 
     except Exception as e:
+        # FloodWaits and transient errors go back to get_msg's retry, possibly on another session
+        if classify(e) != PERMANENT:
+            raise
         logger.error(f"Error in copy_message: {str(e)}")
-        await edit.edit(f"❌ Error: {str(e)}")
+        journal.fail(e)
+        await edit.finish(f"❌ Error: {str(e)}")
 
-async def download_and_process_media(userbot, msg, edit):
-    """Download and process media files"""
+async def server_side_copy(app, msg, sender):
+    """Copy unprotected media through Telegram without downloading it"""
+    if msg.has_protected_content or getattr(msg.chat, "has_protected_content", False):
+        return False
+    if msg.chat.id in no_server_copy_chats:
+        return False
+
+    caption = apply_caption_rules(sender, msg.caption)
     try:
-        file = await userbot.download_media(
-            msg,
-            progress=progress_callback,
-            progress_args=(
-                "╭─────────────────────╮\n│ **__Downloading...__**\n├─────────────────────",
-                edit,
-                time.time()
-            )
+        copied = await app.copy_message(
+            sender,
+            msg.chat.id,
+            msg.id,
+            caption=caption if caption != msg.caption else None
+        )
+        await deliver(copied, sender)
+        return True
+    except FloodWait:
+        raise
+    except (ChannelPrivate, ChannelInvalid, ChatIdInvalid, PeerIdInvalid, ChatForwardsRestricted, KeyError, ValueError) as e:
+        # The bot cannot see or forward from this chat; stop trying for it
+        logger.info(f"Server-side copy unavailable for {msg.chat.id}: {e}")
+        no_server_copy_chats.add(msg.chat.id)
+    except RPCError as e:
+        logger.info(f"Server-side copy failed for {msg.chat.id}/{msg.id}: {e}")
+    return False
+
+def album_input_media(msg, file, caption, thumb):
+    """InputMedia for one downloaded album member"""
+    if msg.photo:
+        return InputMediaPhoto(file, caption=caption)
+    if msg.video:
+        return InputMediaVideo(
+            file,
+            thumb=thumb,
+            caption=caption,
+            width=msg.video.width or 0,
+            height=msg.video.height or 0,
+            duration=msg.video.duration or 0,
+            supports_streaming=True
         )
-        return file
+    if msg.audio:
+        return InputMediaAudio(file, thumb=thumb, caption=caption)
+    return InputMediaDocument(file, thumb=thumb, caption=caption)
+
+async def copy_media_group(app, userbot, sender, msg, edit):
+    """Send a whole album in one go; False means fall back to single messages"""
+    key = (sender, msg.chat.id, msg.media_group_id)
+    if key in delivered_albums:
+        # Batches hit every member of the album; it was sent with the first one
+        await edit.delete()
+        return True
+
+    group = await userbot.get_media_group(msg.chat.id, msg.id)
+    if len(group) < 2 or any(media_size(m) > SIZE_LIMIT for m in group):
+        return False
+    captions = [apply_caption_rules(sender, m.caption) or "" for m in group]
+
+    protected = msg.has_protected_content or getattr(msg.chat, "has_protected_content", False)
+    if not protected and msg.chat.id not in no_server_copy_chats:
+        try:
+            await deliver(await app.copy_media_group(sender, msg.chat.id, msg.id, captions=captions), sender)
+            delivered_albums[key] = True
+            await edit.delete()
+            return True
+        except FloodWait:
+            raise
+        except (ChannelPrivate, ChannelInvalid, ChatIdInvalid, PeerIdInvalid, ChatForwardsRestricted, KeyError, ValueError) as e:
+            logger.info(f"Server-side copy unavailable for {msg.chat.id}: {e}")
+            no_server_copy_chats.add(msg.chat.id)
+        except RPCError as e:
+            logger.info(f"Server-side album copy failed for {msg.chat.id}/{msg.id}: {e}")
+
+    try:
+        job = scratch.admit(sender, sum(media_size(m) for m in group))
+    except ScratchFull as e:
+        journal.fail(e)
+        await edit.finish(f"❌ {e}")
+        return True
+
+    try:
+        await edit.edit(f"📥 Downloading album of {len(group)} items...")
+        limit = asyncio.Semaphore(ALBUM_WORKERS)
+
+        async def fetch(member):
+            async with limit:
+                file = await resumable_download(userbot, member, job)
+                thumb = None
+                if member.video or member.document or member.audio:
+                    thumb = thumbnail(sender) or await fetch_source_thumb(userbot, member, job)
+                return file, thumb
+
+        files = await asyncio.gather(*(fetch(m) for m in group))
+        media = [
+            album_input_media(m, file, caption, thumb)
+            for m, (file, thumb), caption in zip(group, files, captions)
+        ]
+
+        await edit.edit(f"📤 Uploading album of {len(group)} items...")
+        sent = await upload_bots.run(
+            lambda bot: bot.send_media_group(sender if bot is app else LOG_GROUP, media)
+        )
+        await deliver(sent, sender)
+        delivered_albums[key] = True
+        await edit.delete()
+    except Exception as e:
+        logger.error(f"Error sending album: {str(e)}")
+        journal.fail(e)
+        await edit.finish(f"❌ Album failed: {str(e)}")
+    finally:
+        scratch.release(job)
+    return True
+
+def media_dc(msg):
+    """Data center that stores a message's media"""
+    media = getattr(msg, msg.media.value, None) if msg.media else None
+    try:
+        return FileId.decode(media.file_id).dc_id
+    except Exception:
+        return None
+
+def media_size(msg):
+    """Size in bytes of a message's media as reported by Telegram"""
+    media = getattr(msg, msg.media.value, None) if msg.media else None
+    return getattr(media, "file_size", 0) or 0
+
+async def download_and_process_media(userbot, msg, edit, job):
+    """Download and process media files"""
+    source = msg
+
+    async def fetch():
+        nonlocal source
+        try:
+            return await resumable_download(
+                userbot,
+                source,
+                job,
+                progress=progress_callback,
+                progress_args=(
+                    "╭─────────────────────╮\n│ **__Downloading...__**\n├─────────────────────",
+                    edit,
+                    time.time()
+                )
+            )
+        except (FileReferenceExpired, FileReferenceInvalid):
+            # The next attempt downloads from a fresh copy; the checkpoint
+            # is keyed by file_unique_id, so it still resumes
+            source = await userbot.get_messages(msg.chat.id, msg.id)
+            raise
+
+    try:
+        # Each retry resumes from the last checkpoint; a failing DC trips its breaker
+        return await retry(fetch, key=("dc", media_dc(msg)))
     except Exception as e:
         logger.error(f"Error downloading media: {str(e)}")
-        await edit.edit(f"❌ Download failed: {str(e)}")
+        journal.fail(e)
+        await edit.finish(f"❌ Download failed: {str(e)}")
         return None
 
-async def upload_processed_media(app, msg, file, sender, edit):
+async def fetch_source_thumb(userbot, msg, job):
+    """Download the small thumbnail Telegram already keeps for the media"""
+    media = getattr(msg, msg.media.value, None)
+    thumbs = getattr(media, "thumbs", None)
+    if not thumbs:
+        return None
+    try:
+        # Largest of the pre-rendered sizes, still only a few KB
+        best = max(thumbs, key=lambda t: t.width * t.height)
+        return await userbot.download_media(best.file_id, file_name=job.file(f"thumb_{media.file_unique_id}.jpg"))
+    except Exception as e:
+        logger.error(f"Error fetching source thumbnail: {e}")
+        return None
+
+async def can_post_to_log_group(client):
+    """Whether `client` resolves LOG_GROUP and is a member, cached per session"""
+    allowed = log_group_access.get(client.name)
+    if allowed is None:
+        try:
+            await client.get_chat_member(LOG_GROUP, "me")
+            allowed = True
+        except (RPCError, KeyError, ValueError) as e:
+            logger.info(f"{client.name} cannot stage uploads in LOG_GROUP: {e}")
+            allowed = False
+        log_group_access[client.name] = allowed
+    return allowed
+
+async def premium_uploader(userbot, size):
+    """A logged-in Premium session that can upload `size` bytes in one piece"""
+    if size > PREMIUM_SIZE_LIMIT or not LOG_GROUP:
+        return None
+    # Owner sessions are normally in LOG_GROUP, a user's own account rarely is
+    for client in (*pros, userbot):
+        if client and getattr(client.me, "is_premium", False) and await can_post_to_log_group(client):
+            return client
+    return None
+
+async def upload_processed_media(app, userbot, msg, file, sender, edit, job):
     """Upload processed media file"""
     try:
-        if os.path.getsize(file) > SIZE_LIMIT:
-            await split_and_upload_file(app, sender, file, msg.caption)
-            return
+        caption = apply_caption_rules(sender, msg.caption)
+        uploader = None
+        size = os.path.getsize(file)
+        if size > SIZE_LIMIT:
+            # Premium sessions stage up to 4GB in LOG_GROUP for the bot to forward
+            uploader = await premium_uploader(userbot, size)
+            if uploader is None:
+                await split_and_upload_file(app, sender, file, caption)
+                return
 
-        await app.send_document(
-            sender,
-            document=file,
-            caption=msg.caption,
-            progress=progress_callback,
-            progress_args=(
-                "╭─────────────────────╮\n│ **__Uploading...__**\n├─────────────────────",
-                edit,
-                time.time()
-            )
+        thumb = thumbnail(sender) or await fetch_source_thumb(userbot, msg, job)
+        progress_args = (
+            "╭─────────────────────╮\n│ **__Uploading...__**\n├─────────────────────",
+            edit,
+            time.time()
         )
+        # Same content, same key: a retried job resumes the parts already sent
+        file_key = (getattr(msg, msg.media.value).file_unique_id, size)
+
+        async def send(bot, target):
+            if msg.video:
+                return await send_video_resumable(
+                    bot,
+                    target,
+                    file,
+                    duration=msg.video.duration or 0,
+                    width=msg.video.width or 0,
+                    height=msg.video.height or 0,
+                    caption=caption,
+                    thumb=thumb,
+                    progress=progress_callback,
+                    progress_args=progress_args,
+                    file_key=file_key
+                )
+            return await send_document_resumable(
+                bot,
+                target,
+                file,
+                caption=caption,
+                thumb=thumb,
+                progress=progress_callback,
+                progress_args=progress_args,
+                file_key=file_key
+            )
+
+        if uploader:
+            try:
+                sent = await send(uploader, LOG_GROUP)
+            except (RPCError, KeyError, ValueError) as e:
+                # e.g. the session was removed from LOG_GROUP after the check
+                log_group_access.pop(uploader.name, None)
+                logger.error(f"Premium upload via {uploader.name} failed: {e}")
+                await split_and_upload_file(app, sender, file, caption)
+                return
+        else:
+            # Helper bots cannot message the user, they upload to LOG_GROUP instead
+            sent = await upload_bots.run(lambda bot: send(bot, sender if bot is app else LOG_GROUP))
+        await deliver(sent, sender)
+        return sent
+    except Exception as e:
+        # FloodWaits and transient errors go back to get_msg's retry, which
+        # resumes the upload from the parts Telegram already acknowledged
+        if classify(e) != PERMANENT:
+            raise
+        logger.error(f"Error uploading media: {str(e)}")
+        journal.fail(e)
+        await edit.finish(f"❌ Upload failed: {str(e)}")
+
+async def transfer_in_memory(app, userbot, msg, sender, edit):
+    """Move a small file through RAM instead of the scratch directory"""
+    try:
+        buffer = await userbot.download_media(msg, in_memory=True)
+        if buffer is None:
+            raise ValueError("no media returned")
+    except Exception as e:
+        logger.error(f"Error downloading media: {str(e)}")
+        journal.fail(e)
+        await edit.finish(f"❌ Download failed: {str(e)}")
+        return None
+
+    try:
+        caption = apply_caption_rules(sender, msg.caption)
+        thumb = thumbnail(sender)
+        media = getattr(msg, msg.media.value, None)
+        if thumb is None and getattr(media, "thumbs", None):
+            best = max(media.thumbs, key=lambda t: t.width * t.height)
+            thumb = await userbot.download_media(best.file_id, in_memory=True)
+
+        async def send(bot, target):
+            buffer.seek(0)
+            if thumb and not isinstance(thumb, str):
+                thumb.seek(0)
+            if msg.photo:
+                return await bot.send_photo(target, buffer, caption=caption)
+            if msg.video:
+                return await bot.send_video(
+                    target,
+                    buffer,
+                    duration=msg.video.duration or 0,
+                    width=msg.video.width or 0,
+                    height=msg.video.height or 0,
+                    caption=caption,
+                    thumb=thumb,
+                    supports_streaming=True
+                )
+            if msg.audio:
+                return await bot.send_audio(target, buffer, caption=caption, thumb=thumb)
+            return await bot.send_document(target, buffer, caption=caption, thumb=thumb, file_name=buffer.name)
+
+        sent = await upload_bots.run(lambda bot: send(bot, sender if bot is app else LOG_GROUP))
+        await deliver(sent, sender)
+        await edit.delete()
+        return sent
     except Exception as e:
         logger.error(f"Error uploading media: {str(e)}")
-        await edit.edit(f"❌ Upload failed: {str(e)}")
+        journal.fail(e)
+        await edit.finish(f"❌ Upload failed: {str(e)}")
+    finally:
+        buffer.close()
 
-async def clone_message(app, msg, target_chat_id, topic_id, edit_id, log_group):
+async def clone_message(app, msg, target_chat_id, topic_id, edit, log_group):
     """Clone a message to target chat"""
-    edit = await app.edit_message_text(target_chat_id, edit_id, "Cloning...")
+    await edit.edit("Cloning...")
     devgaganin = await app.send_message(target_chat_id, msg.text.markdown, reply_to_message_id=topic_id)
-    await devgaganin.copy(log_group)
+    await deliver(devgaganin, target_chat_id)
     await edit.delete()
 
-async def clone_text_message(app, msg, target_chat_id, topic_id, edit_id, log_group):
+async def clone_text_message(app, msg, target_chat_id, topic_id, edit, log_group):
     """Clone a text message to target chat"""
-    edit = await app.edit_message_text(target_chat_id, edit_id, "Cloning text message...")
+    await edit.edit("Cloning text message...")
     devgaganin = await app.send_message(target_chat_id, msg.text.markdown, reply_to_message_id=topic_id)
-    await devgaganin.copy(log_group)
+    await deliver(devgaganin, target_chat_id)
     await edit.delete()
 
-async def handle_sticker(app, msg, target_chat_id, topic_id, edit_id, log_group):
+async def handle_sticker(app, msg, target_chat_id, topic_id, edit, log_group):
     """Handle sticker messages"""
-    edit = await app.edit_message_text(target_chat_id, edit_id, "Handling sticker...")
+    await edit.edit("Handling sticker...")
     result = await app.send_sticker(target_chat_id, msg.sticker.file_id, reply_to_message_id=topic_id)
-    await result.copy(log_group)
+    await deliver(result, target_chat_id)
     await edit.delete()
 
 async def download_user_stories(userbot, chat_id, msg_id, edit, sender):
@@ -226,31 +657,156 @@ async def download_user_stories(userbot, chat_id, msg_id, edit, sender):
     try:
         story = await userbot.get_stories(chat_id, msg_id)
         if not story:
-            await edit.edit("No story available for this user.")
+            await edit.finish("No story available for this user.")
             return  
         if not story.media:
-            await edit.edit("The story doesn't contain any media.")
+            await edit.finish("The story doesn't contain any media.")
             return
 
-        await edit.edit("Downloading Story...")
-        file_path = await userbot.download_media(story)
-        
-        if story.media:
+        with scratch.job(sender, media_size(story)) as job:
+            await edit.edit("Downloading Story...")
+            file_path = await userbot.download_media(story, file_name=job.download_dir)
+
             await edit.edit("Uploading Story...")
             if story.media == MessageMediaType.VIDEO:
-                await app.send_video(sender, file_path)
+                await deliver(await app.send_video(sender, file_path), sender)
             elif story.media == MessageMediaType.DOCUMENT:
-                await app.send_document(sender, file_path)
+                await deliver(await app.send_document(sender, file_path), sender)
             elif story.media == MessageMediaType.PHOTO:
-                await app.send_photo(sender, file_path)
+                await deliver(await app.send_photo(sender, file_path), sender)
 
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)  
-            
-        await edit.edit("Story processed successfully.")
+    except ScratchFull as e:
+        journal.fail(e)
+        await edit.finish(f"❌ {e}")
     except RPCError as e:
         logger.error(f"Failed to fetch story: {e}")
-        await edit.edit(f"Error: {e}")
+        journal.fail(e)
+        await edit.finish(f"Error: {e}")
+
+async def list_stories(client, chat_id, pinned=False):
+    """All active (or pinned) stories of a peer, plus the peer's id"""
+    peer = await client.resolve_peer(chat_id)
+    if pinned:
+        r = await client.invoke(raw.functions.stories.GetPinnedStories(peer=peer, offset_id=0, limit=100))
+        items = r.stories
+    else:
+        r = await client.invoke(raw.functions.stories.GetPeerStories(peer=peer))
+        items = r.stories.stories
+    # Past the first few, Telegram only sends ids (storyItemSkipped)
+    skipped = [item.id for item in items if isinstance(item, raw.types.StoryItemSkipped)]
+    items = [item for item in items if not isinstance(item, raw.types.StoryItemSkipped)]
+    for start in range(0, len(skipped), STORY_IDS_PER_REQUEST):
+        r = await client.invoke(
+            raw.functions.stories.GetStoriesByID(peer=peer, id=skipped[start:start + STORY_IDS_PER_REQUEST])
+        )
+        items.extend(r.stories)
+    stories = [await types.Story._parse(client, item, peer) for item in items]
+    # Deleted (and any still skipped) stories have no media
+    return utils.get_peer_id(peer), [story for story in stories if getattr(story, "media", None)]
+
+async def download_all_stories(userbot, chat_id, edit, sender, pinned=False):
+    """Send every story of a peer the user has not received yet, as albums"""
+    try:
+        peer_id, stories = await list_stories(userbot, chat_id, pinned)
+        done = await delivered_stories(sender, peer_id)
+        stories = sorted((s for s in stories if s.id not in done), key=lambda s: s.id)
+        if not stories:
+            await edit.finish("No new stories for this user.")
+            return
+
+        with scratch.job(sender, sum(media_size(s) for s in stories)) as job:
+            await edit.edit(f"📥 Downloading {len(stories)} stories...")
+            limit = asyncio.Semaphore(STORY_WORKERS)
+
+            async def fetch(story):
+                async with limit:
+                    return await userbot.download_media(story, file_name=job.file(f"story_{peer_id}_{story.id}"))
+
+            files = await asyncio.gather(*(fetch(s) for s in stories))
+
+            await edit.edit(f"📤 Uploading {len(stories)} stories...")
+            for start in range(0, len(stories), 10):
+                chunk = list(zip(stories[start:start + 10], files[start:start + 10]))
+                if len(chunk) == 1:
+                    story, file = chunk[0]
+                    if story.video:
+                        await deliver(await app.send_video(sender, file, supports_streaming=True), sender)
+                    else:
+                        await deliver(await app.send_photo(sender, file), sender)
+                else:
+                    sent = await app.send_media_group(sender, [
+                        InputMediaVideo(file, supports_streaming=True) if story.video else InputMediaPhoto(file)
+                        for story, file in chunk
+                    ])
+                    await deliver(sent, sender)
+                await mark_delivered(sender, peer_id, [story.id for story, _ in chunk])
+
+        await edit.finish(f"✅ Sent {len(stories)} stories.")
+    except ScratchFull as e:
+        await edit.finish(f"❌ {e}")
+    except RPCError as e:
+        logger.error(f"Failed to fetch stories: {e}")
+        await edit.finish(f"Error: {e}")
+
+async def search_media_ids(client, chat_id, kind, query="", first_id=0, last_id=0, limit=0):
+    """Ids of messages of one media kind, searched server-side, oldest first"""
+    peer = await client.resolve_peer(chat_id)
+    ids = []
+    offset_id = 0
+    while True:
+        # Search only returns ids and raw media; nothing is parsed or downloaded here
+        r = await client.invoke(
+            raw.functions.messages.Search(
+                peer=peer,
+                q=query,
+                filter=SEARCH_FILTERS[kind].value(),
+                min_date=0,
+                max_date=0,
+                offset_id=offset_id,
+                add_offset=0,
+                limit=100,
+                max_id=last_id + 1 if last_id else 0,
+                min_id=first_id - 1 if first_id else 0,
+                hash=0
+            )
+        )
+        for m in r.messages:
+            if kind == "pdf" and getattr(getattr(m.media, "document", None), "mime_type", None) != "application/pdf":
+                continue
+            ids.append(m.id)
+        if len(r.messages) < 100 or (limit and len(ids) >= limit):
+            break
+        offset_id = r.messages[-1].id
+    ids.sort()
+    return ids[-limit:] if limit else ids
+
+async def history_ids_after(client, chat_id, after, limit=0):
+    """Ids of regular messages newer than `after`, oldest first, at most `limit`"""
+    peer = await client.resolve_peer(chat_id)
+    ids = set()
+    offset_id = after + 1
+    while not limit or len(ids) < limit:
+        # A negative add_offset pages upward from offset_id; get_chat_history
+        # always pages down from the newest message
+        r = await client.invoke(
+            raw.functions.messages.GetHistory(
+                peer=peer,
+                offset_id=offset_id,
+                offset_date=0,
+                add_offset=-100,
+                limit=100,
+                max_id=0,
+                min_id=after,
+                hash=0
+            )
+        )
+        page = [m for m in r.messages if m.id > after]
+        ids.update(m.id for m in page if isinstance(m, raw.types.Message))
+        if len(r.messages) < 100 or not page:
+            break
+        offset_id = max(m.id for m in page) + 1
+    ids = sorted(ids)
+    return ids[:limit] if limit else ids
 
 # Database helper functions
 def load_user_data(user_id, key, default_value=None):
@@ -275,9 +831,15 @@ def save_user_data(user_id, key, value):
 
 # User preference functions
 load_delete_words = lambda user_id: set(load_user_data(user_id, "delete_words", []))
-save_delete_words = lambda user_id, words: save_user_data(user_id, "delete_words", list(words))
 load_replacement_words = lambda user_id: load_user_data(user_id, "replacement_words", {})
-save_replacement_words = lambda user_id, replacements: save_user_data(user_id, "replacement_words", replacements)
+
+def save_delete_words(user_id, words):
+    save_user_data(user_id, "delete_words", list(words))
+    caption_rules_cache.pop(user_id, None)
+
+def save_replacement_words(user_id, replacements):
+    save_user_data(user_id, "replacement_words", replacements)
+    caption_rules_cache.pop(user_id, None)
 
 async def load_user_session(user_id):
     """Load user session from database"""
@@ -0,0 +1,208 @@
+# ---------------------------------------------------
+# File Name: governor.py
+# Description: Adaptive token-bucket rate limiting for every client's RPCs
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import time
+import asyncio
+import logging
+from pyrogram import utils
+from pyrogram.errors import FloodWait
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, lower runs first when tokens are short
+DELIVERY = 0
+FETCH = 1
+COSMETIC = 2
+
+# Tokens a class leaves in a bucket for higher classes
+RESERVE = {DELIVERY: 0, FETCH: 1, COSMETIC: 2}
+
+_DELIVERY_METHODS = {
+    "SendMessage", "SendMedia", "SendMultiMedia", "ForwardMessages",
+    "SaveFilePart", "SaveBigFilePart", "UploadMedia"
+}
+_COSMETIC_METHODS = {
+    "EditMessage", "DeleteMessages", "SetTyping", "UpdatePinnedMessage",
+    "SetBotCommands", "SetBotCallbackAnswer"
+}
+# Methods Telegram limits per destination chat
+_CHAT_WRITE_PREFIXES = ("Send", "Forward", "Edit", "Delete", "UpdatePinned")
+
+# (rate per second, burst) per client and method
+METHOD_RATE = (20.0, 30)
+# Per destination: private chats take about 1 msg/s, groups about 20/min
+USER_CHAT_RATE = (1.0, 3)
+GROUP_CHAT_RATE = (0.33, 3)
+# Rates never drop below this share of their base after FloodWaits
+MIN_RATE_SHARE = 0.05
+# Seconds without a FloodWait before a halved rate starts recovering, and
+# seconds it then takes to climb back to the base rate
+RECOVERY_DELAY = 30
+RECOVERY_TIME = 120
+# Idle chat buckets are pruned beyond this many
+MAX_BUCKETS = 5000
+
+
+class TokenBucket:
+    """Token bucket whose rate halves on FloodWait and recovers linearly"""
+
+    __slots__ = ("base_rate", "rate", "capacity", "tokens", "stamp", "paused_until", "last_flood")
+
+    def __init__(self, rate, capacity):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.stamp = time.monotonic()
+        self.paused_until = 0.0
+        self.last_flood = 0.0
+
+    def refill(self, now):
+        elapsed = now - self.stamp
+        self.stamp = now
+        if self.rate < self.base_rate and now - self.last_flood > RECOVERY_DELAY:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * elapsed / RECOVERY_TIME)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def wait_time(self, need, now):
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= need:
+            return 0.0
+        return (need - self.tokens) / self.rate
+
+    def penalize(self, seconds, now):
+        self.rate = max(self.base_rate * MIN_RATE_SHARE, self.rate / 2)
+        self.tokens = 0.0
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.last_flood = now
+
+    @property
+    def idle(self):
+        return self.tokens >= self.capacity and self.rate >= self.base_rate
+
+
+def priority_of(method):
+    if method in _DELIVERY_METHODS:
+        return DELIVERY
+    if method in _COSMETIC_METHODS:
+        return COSMETIC
+    return FETCH
+
+
+class RateGovernor:
+    """Shared buckets per (client, method) and (client, chat) across all clients"""
+
+    def __init__(self):
+        self._buckets = {}
+
+    def _bucket(self, key, rate):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._prune()
+            bucket = self._buckets[key] = TokenBucket(*rate)
+        return bucket
+
+    def _prune(self):
+        now = time.monotonic()
+        for key, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if bucket.idle:
+                del self._buckets[key]
+
+    def buckets(self, client_name, method, chat_id=None):
+        buckets = [self._bucket((client_name, method), METHOD_RATE)]
+        if chat_id is not None and method.startswith(_CHAT_WRITE_PREFIXES):
+            rate = USER_CHAT_RATE if chat_id > 0 else GROUP_CHAT_RATE
+            buckets.append(self._bucket((client_name, chat_id), rate))
+        return buckets
+
+    async def acquire(self, buckets, priority):
+        reserve = RESERVE[priority]
+        while True:
+            now = time.monotonic()
+            wait = 0.0
+            for bucket in buckets:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(1 + min(reserve, bucket.capacity - 1), now))
+            if wait <= 0:
+                for bucket in buckets:
+                    bucket.tokens -= 1
+                return
+            await asyncio.sleep(wait)
+
+    def penalize(self, buckets, seconds):
+        now = time.monotonic()
+        for bucket in buckets:
+            bucket.penalize(seconds, now)
+
+
+governor = RateGovernor()
+
+
+def _chat_of(query):
+    peer = getattr(query, "peer", None) or getattr(query, "to_peer", None)
+    if peer is None:
+        return None
+    try:
+        return utils.get_peer_id(peer)
+    except Exception:
+        return None
+
+
+def govern(client):
+    """Route a Pyrogram client's invoke() through the governor"""
+    original = client.invoke
+
+    async def invoke(query, *args, **kwargs):
+        threshold = kwargs.pop("sleep_threshold", None)
+        if threshold is None:
+            threshold = client.sleep_threshold
+        method = type(query).__name__
+        buckets = governor.buckets(client.name, method, _chat_of(query))
+        priority = priority_of(method)
+        while True:
+            await governor.acquire(buckets, priority)
+            try:
+                # FloodWaits surface here so the buckets learn from them
+                return await original(query, *args, sleep_threshold=0, **kwargs)
+            except FloodWait as e:
+                governor.penalize(buckets, e.value)
+                logger.warning(f"{client.name} {method} FloodWait {e.value}s, slowing down")
+                if e.value > threshold:
+                    raise
+
+    client.invoke = invoke
+    return client
+
+
+def govern_telethon(client, name="telethon"):
+    """Route a Telethon client's requests through the governor"""
+    from telethon.errors import FloodWaitError
+
+    original = client._call
+
+    async def _call(sender, request, ordered=False, flood_sleep_threshold=None):
+        threshold = client.flood_sleep_threshold if flood_sleep_threshold is None else flood_sleep_threshold
+        method = "Batch" if isinstance(request, list) else type(request).__name__.removesuffix("Request")
+        buckets = governor.buckets(name, method)
+        priority = priority_of(method)
+        while True:
+            await governor.acquire(buckets, priority)
+            try:
+                return await original(sender, request, ordered=ordered, flood_sleep_threshold=0)
+            except FloodWaitError as e:
+                governor.penalize(buckets, e.seconds)
+                logger.warning(f"{name} {method} FloodWait {e.seconds}s, slowing down")
+                if e.seconds > threshold:
+                    raise
+
+    client._call = _call
+    return client
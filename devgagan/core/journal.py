@@ -0,0 +1,126 @@
+# ---------------------------------------------------
+# File Name: journal.py
+# Description: Tracks in-flight jobs in Mongo and drains them before restarts
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from devgagan.core.mongo import jobs_db
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress writes for the same job
+PROGRESS_INTERVAL = 10
+
+current_job = ContextVar("current_job", default=None)
+
+
+class JobJournal:
+    """Journal of running jobs plus the drain switch used by /restart"""
+
+    def __init__(self):
+        self.draining = False
+        self.active = {}
+        self._failed = {}
+        self._holds = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def _check_idle(self):
+        if not self.active and not self._holds:
+            self._idle.set()
+        else:
+            self._idle.clear()
+
+    async def queue(self, user_id, link):
+        """Record a job to run later, e.g. after a restart"""
+        return await jobs_db.add_job(user_id, link, jobs_db.QUEUED)
+
+    async def queue_batch(self, user_id, links):
+        """Record every link of a batch up front, so a restart mid-batch loses none"""
+        return await jobs_db.add_jobs(user_id, links, jobs_db.QUEUED)
+
+    async def discard(self, job_ids, reason="cancelled"):
+        """Fail queued jobs that will not run, e.g. the rest of a cancelled batch"""
+        await jobs_db.fail_jobs(job_ids, reason)
+
+    def fail(self, error):
+        """Mark the job running in this context as failed once its block ends"""
+        job_id = current_job.get()
+        if job_id in self.active:
+            self._failed[job_id] = str(error)
+
+    def failed(self):
+        """Whether the job running in this context was marked failed"""
+        return current_job.get() in self._failed
+
+    @asynccontextmanager
+    async def hold(self):
+        """Keep a drain waiting for work that is not journaled as a job"""
+        self._holds += 1
+        self._check_idle()
+        try:
+            yield
+        finally:
+            self._holds -= 1
+            self._check_idle()
+
+    @asynccontextmanager
+    async def track(self, user_id, link, job_id=None):
+        """Journal a job as running for the duration of the block"""
+        if job_id is None:
+            job_id = await jobs_db.add_job(user_id, link, jobs_db.RUNNING)
+        else:
+            await jobs_db.update_job(job_id, status=jobs_db.RUNNING)
+
+        self.active[job_id] = 0.0
+        self._check_idle()
+        token = current_job.set(job_id)
+        try:
+            yield job_id
+        except BaseException as e:
+            # Jobs interrupted by a drain stay "running" so they are re-enqueued
+            if not self.draining:
+                await jobs_db.update_job(job_id, status=jobs_db.FAILED, error=str(e))
+            raise
+        else:
+            error = self._failed.get(job_id)
+            if error:
+                await jobs_db.update_job(job_id, status=jobs_db.FAILED, error=error)
+            else:
+                await jobs_db.update_job(job_id, status=jobs_db.DONE)
+        finally:
+            current_job.reset(token)
+            self.active.pop(job_id, None)
+            self._failed.pop(job_id, None)
+            self._check_idle()
+
+    def progress(self, current, total):
+        """Persist transfer progress of the job running in this context"""
+        job_id = current_job.get()
+        if job_id is None or job_id not in self.active:
+            return
+        now = time.monotonic()
+        if now - self.active[job_id] < PROGRESS_INTERVAL and current != total:
+            return
+        self.active[job_id] = now
+        asyncio.create_task(jobs_db.update_job(job_id, current=current, total=total))
+
+    async def drain(self, timeout):
+        """Stop admitting jobs and wait for running ones; returns how many remain"""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Drain timed out with {len(self.active)} job(s) still running")
+        return len(self.active)
+
+
+journal = JobJournal()
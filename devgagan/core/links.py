@@ -0,0 +1,104 @@
+# ---------------------------------------------------
+# File Name: links.py
+# Description: Precompiled parser for Telegram message links
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import re
+from typing import NamedTuple, Optional, Union
+
+__all__ = [
+    'TelegramLink',
+    'LINK_REGEX',
+    'PUBLIC',
+    'PRIVATE',
+    'STORY',
+    'INVITE',
+    'CHAT',
+    'USER',
+    'parse_link',
+    'parse_links',
+]
+
+# Link kinds
+PUBLIC = "public"      # t.me/<username>/<msg>, t.me/s/<username>/<msg>
+PRIVATE = "private"    # t.me/c/<id>/<msg>
+STORY = "story"        # t.me/<username>/s/<story>
+INVITE = "invite"      # t.me/+<hash>, t.me/joinchat/<hash>
+CHAT = "chat"          # t.me/<username>
+USER = "user"          # tg://openmessage?user_id=<id>&message_id=<msg>
+
+LINK_REGEX = re.compile(
+    r"(?:https?://)?(?:www\.)?(?:t\.me|telegram\.me|telegram\.dog)/(?:"
+    r"c/(?P<c_id>\d+)/(?:(?P<c_topic>\d+)/)?(?P<c_msg>\d+)"
+    r"|(?P<invite>\+[\w-]+|joinchat/[\w-]+)"
+    r"|s/(?P<s_username>[A-Za-z]\w{2,31})/(?P<s_msg>\d+)"
+    r"|(?P<username>[A-Za-z]\w{2,31})(?:/s/(?P<story>\d+)|/(?:(?P<topic>\d+)/)?(?P<msg>\d+))?"
+    r")/?(?![\w/])(?:\?(?P<query>[^\s#]*))?"
+    r"|tg://openmessage\?user_id=(?P<tg_user>-?\d+)&message_id=(?P<tg_msg>\d+)",
+    re.IGNORECASE,
+)
+
+
+class TelegramLink(NamedTuple):
+    """A parsed Telegram link"""
+    chat_ref: Union[int, str]
+    message_id: Optional[int]
+    topic_id: Optional[int]
+    kind: str
+    url: str
+
+
+def _thread(query):
+    """Topic id from a `?thread=` / `?topic=` query, ignoring flags like `?single`"""
+    for param in query.split('&'):
+        key, _, value = param.partition('=')
+        if key in ('thread', 'topic') and value.isdigit():
+            return int(value)
+    return None
+
+
+# tuple.__new__ straight away; the generated TelegramLink.__new__ costs more
+# than the rest of the conversion
+_make = TelegramLink._make
+
+
+def _from_match(match):
+    # Positional groups() is much cheaper than looking each group up by name
+    (c_id, c_topic, c_msg, invite, s_username, s_msg, username, story,
+     topic, msg, query, tg_user, tg_msg) = match.groups()
+    url = match.group()
+    if c_id:
+        topic_id = int(c_topic) if c_topic else _thread(query) if query else None
+        return _make((int("-100" + c_id), int(c_msg), topic_id, PRIVATE, url))
+    if msg:
+        topic_id = int(topic) if topic else _thread(query) if query else None
+        return _make((username, int(msg), topic_id, PUBLIC, url))
+    if s_msg:
+        return _make((s_username, int(s_msg), None, PUBLIC, url))
+    if story:
+        return _make((username, int(story), None, STORY, url))
+    if username:
+        return _make((username, None, None, CHAT, url))
+    if invite:
+        return _make((url, None, None, INVITE, url))
+    return _make((int(tg_user), int(tg_msg), None, USER, url))
+
+
+def parse_link(text):
+    """Return the first Telegram link found in text, or None"""
+    if not text:
+        return None
+    # Most messages are just the link, so try anchored first
+    match = LINK_REGEX.match(text) or LINK_REGEX.search(text)
+    return _from_match(match) if match else None
+
+
+def parse_links(text):
+    """Return every Telegram link found in text, in order"""
+    if not text:
+        return []
+    return [_from_match(match) for match in LINK_REGEX.finditer(text)]
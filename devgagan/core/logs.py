@@ -0,0 +1,173 @@
+# ---------------------------------------------------
+# File Name: logs.py
+# Description: Queue-based logging that never writes from the event loop
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from config import LOG_LEVEL, LOG_FORMAT, LOG_RATE
+
+TEXT_FORMAT = "[%(levelname) 5s/%(asctime)s] %(name)s: %(message)s"
+# Records waiting for the writer thread; past this they are dropped, not waited on
+LOG_QUEUE_SIZE = 10000
+# Records a logger may emit at once before LOG_RATE per second applies
+LOG_BURST = 50
+# Chatty third-party loggers kept to warnings and above
+QUIET_LOGGERS = ("yt_dlp", "pyrogram.session.session", "pyrogram.connection.connection")
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, which log drains can index"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _Budget:
+    __slots__ = ("tokens", "stamp", "dropped")
+
+    def __init__(self, tokens, stamp):
+        self.tokens = tokens
+        self.stamp = stamp
+        self.dropped = 0
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per logger for debug and info records; warnings always pass"""
+
+    def __init__(self, rate=LOG_RATE, burst=LOG_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            budget = self._budgets.get(record.name)
+            if budget is None:
+                budget = self._budgets[record.name] = _Budget(self.burst, now)
+            budget.tokens = min(self.burst, budget.tokens + (now - budget.stamp) * self.rate)
+            budget.stamp = now
+            if budget.tokens < 1:
+                budget.dropped += 1
+                return False
+            budget.tokens -= 1
+            dropped, budget.dropped = budget.dropped, 0
+        if dropped:
+            record.msg = f"{record.msg} [{dropped} earlier records suppressed]"
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the writer falls behind"""
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only merge the message and render the traceback here; the writer
+        # thread does the formatting and the I/O
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            notice = logging.makeLogRecord({
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"Log queue was full, {self.dropped} records dropped",
+            })
+            try:
+                self.queue.put_nowait(notice)
+                self.dropped = 0
+            except queue.Full:
+                pass
+
+
+class _StdoutToLog:
+    """stdout replacement that turns print() lines into log records"""
+
+    encoding = "utf-8"
+
+    def __init__(self, logger, stream):
+        self.logger = logger
+        self.stream = stream
+        self._buffer = ""
+
+    def write(self, text):
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            if line.strip():
+                self.logger.info(line.rstrip())
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def fileno(self):
+        # Subprocesses inherit the real stdout
+        return self.stream.fileno()
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, rate=LOG_RATE):
+    """Send every record and print() through a queue to a writer thread"""
+    global _listener
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    records = queue.Queue(LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(records)
+    handler.addFilter(RateLimitFilter(rate))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    sys.stdout = _StdoutToLog(logging.getLogger("stdout"), sys.stdout)
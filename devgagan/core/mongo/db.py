@@ -14,6 +14,7 @@
 
 from config import MONGO_DB
 from motor.motor_asyncio import AsyncIOMotorClient as MongoCli
+from devgagan.core.mongo.peers_db import delete_user_peers
 mongo = MongoCli(MONGO_DB)
 db = mongo.user_data
 db = db.users_data_db
@@ -63,12 +64,17 @@ async def remove_clean_words(user_id, words_to_remove):
         await db.update_one({"_id": user_id}, {"$set": {"clean_words": updated_words}})
     else:
         await db.insert_one({"_id": user_id, "clean_words": []})
+def _invalidate_targets(user_id):
+    # delivery imports this module, so import it late
+    from devgagan.core.delivery import invalidate_targets
+    invalidate_targets(user_id)
 async def set_channel(user_id, chat_id):
     data = await get_data(user_id)
     if data and data.get("_id"):
         await db.update_one({"_id": user_id}, {"$set": {"chat_id": chat_id}})
     else:
         await db.insert_one({"_id": user_id, "chat_id": chat_id})
+    _invalidate_targets(user_id)
 async def all_words_remove(user_id):
     await db.update_one({"_id": user_id}, {"$set": {"clean_words": None}})
 async def remove_thumbnail(user_id):
@@ -80,9 +86,12 @@ async def remove_replace(user_id):
  
 async def remove_session(user_id):
     await db.update_one({"_id": user_id}, {"$set": {"session": None}})
+    await delete_user_peers(user_id)
 async def remove_channel(user_id):
     await db.update_one({"_id": user_id}, {"$set": {"chat_id": None}})
+    _invalidate_targets(user_id)
 async def delete_session(user_id):
     """Delete the session associated with the given user_id from the database."""
     await db.update_one({"_id": user_id}, {"$unset": {"session": ""}})
+    await delete_user_peers(user_id)
  
\ No newline at end of file
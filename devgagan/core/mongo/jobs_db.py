@@ -0,0 +1,82 @@
+# ---------------------------------------------------
+# File Name: jobs_db.py
+# Description: A Pyrogram bot for downloading files from Telegram channels or groups
+#              and uploading them back to Telegram.
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Telegram: https://t.me/team_spy_pro
+# YouTube: https://youtube.com/@dev_gagan
+# Created: 2025-01-11
+# Last Modified: 2025-01-11
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import datetime
+from motor.motor_asyncio import AsyncIOMotorClient as MongoCli
+from config import MONGO_DB
+
+mongo = MongoCli(MONGO_DB)
+db = mongo.jobs
+db = db.jobs_db
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+async def add_job(user_id, link, status=QUEUED):
+    now = datetime.datetime.utcnow()
+    result = await db.insert_one({
+        "user_id": user_id,
+        "link": link,
+        "status": status,
+        "current": 0,
+        "total": 0,
+        "created_at": now,
+        "updated_at": now,
+    })
+    return result.inserted_id
+
+async def add_jobs(user_id, links, status=QUEUED):
+    """Journal a whole batch at once; returns the job ids in link order"""
+    now = datetime.datetime.utcnow()
+    result = await db.insert_many([{
+        "user_id": user_id,
+        "link": link,
+        "status": status,
+        "current": 0,
+        "total": 0,
+        "created_at": now,
+        "updated_at": now,
+    } for link in links], ordered=True)
+    return result.inserted_ids
+
+async def fail_jobs(job_ids, error):
+    if job_ids:
+        await db.update_many(
+            {"_id": {"$in": list(job_ids)}, "status": QUEUED},
+            {"$set": {"status": FAILED, "error": error, "updated_at": datetime.datetime.utcnow()}}
+        )
+
+async def update_job(job_id, **fields):
+    fields["updated_at"] = datetime.datetime.utcnow()
+    await db.update_one({"_id": job_id}, {"$set": fields})
+
+async def unfinished_jobs(max_age_hours=24):
+    """Queued or running jobs touched recently, oldest first"""
+    since = datetime.datetime.utcnow() - datetime.timedelta(hours=max_age_hours)
+    jobs = []
+    async for job in db.find(
+        {"status": {"$in": [QUEUED, RUNNING]}, "updated_at": {"$gte": since}}
+    ).sort("created_at", 1):
+        jobs.append(job)
+    return jobs
+
+async def expire_stale_jobs(max_age_hours=24):
+    since = datetime.datetime.utcnow() - datetime.timedelta(hours=max_age_hours)
+    await db.update_many(
+        {"status": {"$in": [QUEUED, RUNNING]}, "updated_at": {"$lt": since}},
+        {"$set": {"status": FAILED, "error": "expired"}}
+    )
@@ -0,0 +1,62 @@
+# ---------------------------------------------------
+# File Name: peers_db.py
+# Description: A Pyrogram bot for downloading files from Telegram channels or groups
+#              and uploading them back to Telegram.
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Telegram: https://t.me/team_spy_pro
+# YouTube: https://youtube.com/@dev_gagan
+# Created: 2025-01-11
+# Last Modified: 2025-01-11
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+from motor.motor_asyncio import AsyncIOMotorClient as MongoCli
+from pymongo import UpdateOne
+from config import MONGO_DB
+
+mongo = MongoCli(MONGO_DB)
+db = mongo.userbot_storage
+db = db.peers
+
+_FIELDS = {"peer_id": 1, "access_hash": 1, "type": 1, "username": 1, "phone_number": 1, "updated": 1}
+
+
+async def create_indexes():
+    await db.create_index([("owner", 1), ("peer_id", 1)], unique=True)
+    await db.create_index([("owner", 1), ("username", 1)])
+    await db.create_index([("owner", 1), ("phone_number", 1)])
+    await db.create_index("user_id")
+
+async def save_peers(owner, user_id, peers):
+    """Upsert (id, access_hash, type, username, phone_number, updated) tuples seen by account `owner`.
+
+    Access hashes belong to the Telegram account, so `owner` is its id;
+    `user_id` is the bot user who logged it in, used to clear them on logout.
+    """
+    if not peers:
+        return
+    await db.bulk_write([
+        UpdateOne(
+            {"owner": owner, "peer_id": peer_id},
+            {"$set": {
+                "user_id": user_id,
+                "access_hash": access_hash,
+                "type": peer_type,
+                "username": username,
+                "phone_number": phone_number,
+                "updated": updated
+            }},
+            upsert=True
+        )
+        for peer_id, access_hash, peer_type, username, phone_number, updated in peers
+    ], ordered=False)
+
+async def find_peer(owner, **query):
+    """Peer document of `owner` matching peer_id, username or phone_number"""
+    return await db.find_one({"owner": owner, **query}, _FIELDS)
+
+async def delete_user_peers(user_id):
+    """Forget every peer cached for the sessions a bot user logged in"""
+    await db.delete_many({"user_id": user_id})
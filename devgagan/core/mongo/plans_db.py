@@ -19,6 +19,11 @@ from config import MONGO_DB
 mongo = MongoCli(MONGO_DB)
 db = mongo.premium
 db = db.premium_db
+
+def _invalidate_access(user_id):
+    # access imports this module, so import it late
+    from devgagan.core.access import invalidate_access
+    invalidate_access(user_id)
  
 async def add_premium(user_id, expire_date):
     data = await check_premium(user_id)
@@ -26,9 +31,11 @@ async def add_premium(user_id, expire_date):
         await db.update_one({"_id": user_id}, {"$set": {"expire_date": expire_date}})
     else:
         await db.insert_one({"_id": user_id, "expire_date": expire_date})
+    _invalidate_access(user_id)
  
 async def remove_premium(user_id):
     await db.delete_one({"_id": user_id})
+    _invalidate_access(user_id)
  
 async def check_premium(user_id):
     return await db.find_one({"_id": user_id})
@@ -0,0 +1,33 @@
+# ---------------------------------------------------
+# File Name: stories_db.py
+# Description: A Pyrogram bot for downloading files from Telegram channels or groups
+#              and uploading them back to Telegram.
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Telegram: https://t.me/team_spy_pro
+# YouTube: https://youtube.com/@dev_gagan
+# Created: 2025-01-11
+# Last Modified: 2025-01-11
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+from motor.motor_asyncio import AsyncIOMotorClient as MongoCli
+from config import MONGO_DB
+
+mongo = MongoCli(MONGO_DB)
+db = mongo.stories
+db = db.stories_db
+
+
+async def delivered_stories(user_id, peer_id):
+    """Ids of the peer's stories already sent to the user"""
+    doc = await db.find_one({"user_id": user_id, "peer_id": peer_id}, {"story_ids": 1})
+    return set(doc["story_ids"]) if doc else set()
+
+async def mark_delivered(user_id, peer_id, story_ids):
+    await db.update_one(
+        {"user_id": user_id, "peer_id": peer_id},
+        {"$addToSet": {"story_ids": {"$each": list(story_ids)}}},
+        upsert=True
+    )
@@ -0,0 +1,34 @@
+# ---------------------------------------------------
+# File Name: sync_db.py
+# Description: A Pyrogram bot for downloading files from Telegram channels or groups
+#              and uploading them back to Telegram.
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Telegram: https://t.me/team_spy_pro
+# YouTube: https://youtube.com/@dev_gagan
+# Created: 2025-01-11
+# Last Modified: 2025-01-11
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+from motor.motor_asyncio import AsyncIOMotorClient as MongoCli
+from config import MONGO_DB
+
+mongo = MongoCli(MONGO_DB)
+db = mongo.sync
+db = db.sync_db
+
+
+async def get_mark(user_id, chat_id):
+    """Highest message id of the chat already extracted for the user"""
+    doc = await db.find_one({"user_id": user_id, "chat_id": chat_id}, {"last_id": 1})
+    return doc["last_id"] if doc else None
+
+async def set_mark(user_id, chat_id, last_id):
+    # $max keeps the mark from moving backwards if runs overlap
+    await db.update_one(
+        {"user_id": user_id, "chat_id": chat_id},
+        {"$max": {"last_id": last_id}},
+        upsert=True
+    )
@@ -0,0 +1,131 @@
+# ---------------------------------------------------
+# File Name: pool.py
+# Description: Load and FloodWait aware selection among several clients
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pyrogram.errors import (
+    FloodWait,
+    AuthKeyUnregistered,
+    SessionRevoked,
+    UserDeactivated,
+    UserDeactivatedBan
+)
+
+logger = logging.getLogger(__name__)
+
+# Errors after which a session will never work again
+DEAD_ERRORS = (AuthKeyUnregistered, SessionRevoked, UserDeactivated, UserDeactivatedBan)
+
+
+class PoolMember:
+    """A client plus the bookkeeping used to pick it"""
+
+    __slots__ = ("client", "name", "load", "flood_until", "failures")
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.load = 0
+        self.flood_until = 0.0
+        self.failures = 0
+
+    @property
+    def available(self):
+        return time.monotonic() >= self.flood_until
+
+
+class ClientPool:
+    """Hands out the least-loaded client that is not waiting out a FloodWait"""
+
+    def __init__(self, clients=()):
+        self.members = []
+        for name, client in clients:
+            self.add(client, name)
+
+    def add(self, client, name=None):
+        self.members.append(PoolMember(client, name or getattr(client, "name", str(len(self.members)))))
+
+    def __len__(self):
+        return len(self.members)
+
+    def member(self, client):
+        for member in self.members:
+            if member.client is client:
+                return member
+        return None
+
+    def pick(self, exclude=()):
+        """Best member right now, or None if the pool is empty"""
+        members = [m for m in self.healthy if m.client not in exclude] or self.healthy
+        if not members:
+            return None
+        ready = [m for m in members if m.available]
+        if ready:
+            return min(ready, key=lambda m: (m.load, m.failures))
+        # Everyone is limited: take whoever is released first
+        return min(members, key=lambda m: m.flood_until)
+
+    def disable(self, client, reason):
+        member = self.member(client)
+        if member:
+            member.flood_until = float("inf")
+            logger.error(f"{member.name} disabled: {reason}")
+
+    @property
+    def healthy(self):
+        return [m for m in self.members if m.flood_until != float("inf")]
+
+    def flood(self, client, seconds):
+        member = self.member(client)
+        if member:
+            member.flood_until = time.monotonic() + seconds
+            logger.warning(f"{member.name} is under FloodWait for {seconds}s")
+
+    @asynccontextmanager
+    async def acquire(self, exclude=()):
+        """Yield a client, recording its load and any FloodWait it raises"""
+        member = self.pick(exclude)
+        if member is None:
+            raise RuntimeError("Client pool is empty")
+        wait = member.flood_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        member.load += 1
+        try:
+            yield member.client
+        except FloodWait as e:
+            self.flood(member.client, e.value)
+            raise
+        except DEAD_ERRORS as e:
+            self.disable(member.client, e)
+            raise
+        except Exception:
+            member.failures += 1
+            raise
+        else:
+            member.failures = 0
+        finally:
+            member.load -= 1
+
+    async def run(self, fn, attempts=None):
+        """Call `fn(client)`, failing over to another client on FloodWait"""
+        # With a single client the second attempt waits out its FloodWait
+        attempts = attempts or max(len(self.members), 2)
+        tried = []
+        for attempt in range(attempts):
+            try:
+                async with self.acquire(exclude=tried) as client:
+                    return await fn(client)
+            except FloodWait:
+                if attempt == attempts - 1:
+                    raise
+                tried.append(client)
@@ -0,0 +1,160 @@
+# ---------------------------------------------------
+# File Name: resume.py
+# Description: Resumable downloads with on-disk checkpoints
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import os
+import json
+import time
+import zlib
+import shutil
+import asyncio
+import logging
+import mimetypes
+import aiofiles
+from devgagan.core.scratch import scratch
+
+logger = logging.getLogger(__name__)
+
+# Pyrogram streams media in 1 MiB chunks and resumes at chunk offsets
+CHUNK_SIZE = 1024 * 1024
+# Chunks written between checkpoints
+CHECKPOINT_EVERY = 16
+
+RESUME_DIR = os.path.join(scratch.root, scratch.RESUME)
+
+
+class _KeyLock:
+    """Lock plus the number of coroutines holding or waiting on it"""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+# file_unique_id -> _KeyLock, so two jobs never write the same partial file.
+# Entries go once nobody holds or waits on them.
+_locks = {}
+
+
+def _media(msg):
+    return getattr(msg, msg.media.value, None) if msg.media else None
+
+
+def media_file_name(msg):
+    """File name Telegram knows for the media, or one derived from its type"""
+    media = _media(msg)
+    name = getattr(media, "file_name", None)
+    if name:
+        return os.path.basename(name)
+    ext = mimetypes.guess_extension(getattr(media, "mime_type", None) or "") or ".jpg"
+    return f"{msg.media.value}_{media.file_unique_id}{ext}"
+
+
+def _load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_checkpoint(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _verified_offset(part_path, checkpoint, size):
+    """Bytes of `part_path` that match the checkpoint, truncating the rest"""
+    if not checkpoint or checkpoint.get("size") != size or not os.path.exists(part_path):
+        return 0
+    offset = checkpoint.get("offset", 0)
+    if offset <= 0 or offset % CHUNK_SIZE or os.path.getsize(part_path) < offset:
+        return 0
+    # Spot-check the last checkpointed chunk instead of rehashing the whole prefix
+    with open(part_path, "r+b") as f:
+        f.seek(offset - CHUNK_SIZE)
+        if zlib.crc32(f.read(CHUNK_SIZE)) != checkpoint.get("tail_crc"):
+            return 0
+        f.truncate(offset)
+    return offset
+
+
+async def resumable_download(client, msg, job, progress=None, progress_args=()):
+    """Download `msg` media into `job`, continuing from the last checkpoint"""
+    key = _media(msg).file_unique_id
+    entry = _locks.get(key)
+    if entry is None:
+        entry = _locks[key] = _KeyLock()
+    # Counted before waiting: release() hands the lock to a waiter that has
+    # not reacquired it yet, so locked() alone cannot tell it is still needed
+    entry.users += 1
+    try:
+        async with entry.lock:
+            return await _download(client, msg, job, progress, progress_args)
+    finally:
+        entry.users -= 1
+        if not entry.users:
+            _locks.pop(key, None)
+
+
+async def _download(client, msg, job, progress, progress_args):
+    media = _media(msg)
+    size = getattr(media, "file_size", 0) or 0
+    state_dir = os.path.join(RESUME_DIR, media.file_unique_id)
+    os.makedirs(state_dir, exist_ok=True)
+    part_path = os.path.join(state_dir, "data.part")
+    checkpoint_path = os.path.join(state_dir, "checkpoint.json")
+
+    offset = await asyncio.to_thread(
+        _verified_offset, part_path, _load_checkpoint(checkpoint_path), size
+    )
+    if offset:
+        logger.info(f"Resuming {media.file_unique_id} at {offset} of {size} bytes")
+
+    written = offset
+    since_checkpoint = 0
+    tail_crc = None
+    async with aiofiles.open(part_path, "r+b" if offset else "wb") as f:
+        await f.seek(offset)
+        async for chunk in client.stream_media(msg, offset=offset // CHUNK_SIZE):
+            await f.write(chunk)
+            written += len(chunk)
+            since_checkpoint += 1
+            if len(chunk) == CHUNK_SIZE:
+                tail_crc = zlib.crc32(chunk)
+                if since_checkpoint >= CHECKPOINT_EVERY:
+                    await f.flush()
+                    await asyncio.to_thread(os.fsync, f.fileno())
+                    await asyncio.to_thread(_save_checkpoint, checkpoint_path, {
+                        "size": size,
+                        "offset": written,
+                        "tail_crc": tail_crc,
+                        "updated": time.time(),
+                    })
+                    since_checkpoint = 0
+            if progress:
+                await progress(written, size or written, *progress_args)
+
+    if size and written != size:
+        raise IOError(f"Download ended at {written} of {size} bytes")
+
+    name = media_file_name(msg)
+    file_path = job.file(name)
+    if os.path.exists(file_path):
+        # Album members share the job directory and often the file name;
+        # nothing awaits between the check and the move, so this is race free
+        file_path = job.file(f"{msg.id}_{name}")
+    os.replace(part_path, file_path)
+    shutil.rmtree(state_dir, ignore_errors=True)
+    return file_path
@@ -0,0 +1,139 @@
+# ---------------------------------------------------
+# File Name: retry.py
+# Description: Shared retry policy with FloodWait-aware backoff and circuit breakers
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import time
+import random
+import asyncio
+import logging
+from pyrogram.errors import (
+    RPCError,
+    FloodWait,
+    BadRequest,
+    Unauthorized,
+    Forbidden,
+    NotAcceptable,
+    FileReferenceExpired,
+    FileReferenceInvalid
+)
+from devgagan.core.state import TTLMap
+
+logger = logging.getLogger(__name__)
+
+# Error classes
+FLOOD = "flood"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+RETRY_ATTEMPTS = 4
+BACKOFF_BASE = 1
+BACKOFF_CAP = 60
+# FloodWaits longer than this are not slept through, the caller is told instead
+MAX_FLOOD_WAIT = 300
+
+# Consecutive failures that open a breaker, and how long it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 300
+
+
+class CircuitOpen(Exception):
+    """A source failed too often recently and is skipped for now"""
+
+    def __init__(self, key, remaining):
+        super().__init__(f"{key} is failing, retry in {int(remaining)}s")
+        self.key = key
+        self.remaining = remaining
+
+
+def classify(error):
+    """FLOOD, TRANSIENT or PERMANENT for an exception raised by a Telegram call"""
+    if isinstance(error, FloodWait):
+        return FLOOD
+    # Callers that retry these refetch the message for a fresh file reference
+    if isinstance(error, (FileReferenceExpired, FileReferenceInvalid)):
+        return TRANSIENT
+    if isinstance(error, (BadRequest, Unauthorized, Forbidden, NotAcceptable)):
+        return PERMANENT
+    # 5xx, 303, network and timeouts
+    if isinstance(error, (RPCError, OSError, asyncio.TimeoutError, EOFError)):
+        return TRANSIENT
+    # Anything else (unknown peers, code bugs) would fail the same way again
+    return PERMANENT
+
+
+def backoff(attempt):
+    """Full-jitter exponential delay for the given retry attempt"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Counts consecutive failures per key (a chat, a DC) and fails fast once open"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        # Both forget a key once it has been quiet for a while
+        self._failures = TTLMap(ttl=cooldown)
+        self._open_until = TTLMap(ttl=2 * cooldown)
+
+    def check(self, key):
+        until = self._open_until.get(key)
+        if until is None:
+            return
+        remaining = until - time.monotonic()
+        if remaining > 0:
+            raise CircuitOpen(key, remaining)
+        # Half-open: let one call through, a single failure reopens it
+        del self._open_until[key]
+        self._failures[key] = self.threshold - 1
+
+    def success(self, key):
+        self._failures.pop(key, None)
+        self._open_until.pop(key, None)
+
+    def failure(self, key):
+        failures = self._failures.get(key, 0) + 1
+        self._failures[key] = failures
+        if failures >= self.threshold:
+            self._open_until[key] = time.monotonic() + self.cooldown
+            logger.warning(f"Circuit for {key} opened after {failures} failures")
+
+
+breakers = CircuitBreaker()
+
+
+async def retry(fn, key=None, attempts=RETRY_ATTEMPTS, failover=False):
+    """Await `fn()` until it succeeds, a permanent error occurs or attempts run out.
+
+    `key` ties the call to a circuit breaker. With `failover`, a FloodWait
+    is not slept through because the next attempt uses another client.
+    """
+    for attempt in range(attempts):
+        if key is not None:
+            breakers.check(key)
+        try:
+            result = await fn()
+        except Exception as e:
+            kind = classify(e)
+            # Only Telegram and network trouble says something about the source
+            if kind == TRANSIENT and key is not None:
+                breakers.failure(key)
+            if kind == PERMANENT or attempt == attempts - 1:
+                raise
+            if kind == FLOOD:
+                if e.value > MAX_FLOOD_WAIT:
+                    raise
+                delay = backoff(0) if failover else e.value + random.uniform(0, 1)
+            else:
+                delay = backoff(attempt)
+            logger.warning(f"Retrying after {kind} error ({e}), attempt {attempt + 1}/{attempts}, sleeping {delay:.1f}s")
+            await asyncio.sleep(delay)
+        else:
+            if key is not None:
+                breakers.success(key)
+            return result
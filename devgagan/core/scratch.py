@@ -0,0 +1,196 @@
+# ---------------------------------------------------
+# File Name: scratch.py
+# Description: Per-job scratch directories with disk quotas and sweeping
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import os
+import glob
+import time
+import shutil
+import logging
+from contextlib import contextmanager
+from config import (
+    SCRATCH_DIR,
+    SCRATCH_QUOTA_MB,
+    USER_SCRATCH_QUOTA_MB,
+    SCRATCH_RESERVE_MB,
+    SCRATCH_MAX_AGE
+)
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class ScratchFull(Exception):
+    """Raised when a job cannot be admitted without exceeding a disk limit"""
+
+
+class ScratchJob:
+    """A working directory reserved for one transfer"""
+
+    __slots__ = ("user_id", "size", "path", "created")
+
+    def __init__(self, user_id, size, path):
+        self.user_id = user_id
+        self.size = size
+        self.path = path
+        self.created = time.time()
+
+    def file(self, name):
+        """Path for a file inside the job directory"""
+        return os.path.join(self.path, os.path.basename(name))
+
+    @property
+    def download_dir(self):
+        """Directory form accepted by Pyrogram's `download_media(file_name=...)`"""
+        return self.path + os.sep
+
+
+class ScratchSpace:
+    """Admits jobs against per-user and global byte quotas"""
+
+    # Partial downloads kept across retries and restarts, see resume.py
+    RESUME = "resume"
+
+    def __init__(self, root, quota, user_quota, reserve, max_age):
+        self.root = os.path.abspath(root)
+        self.quota = quota
+        self.user_quota = user_quota
+        self.reserve = reserve
+        self.max_age = max_age
+        self.jobs = {}
+        self._counter = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def reserved(self, user_id=None):
+        return sum(
+            job.size for job in self.jobs.values()
+            if user_id is None or job.user_id == user_id
+        )
+
+    def admit(self, user_id, size=0):
+        """Reserve `size` bytes for a new job or raise ScratchFull"""
+        size = size or 0
+        if self.reserved(user_id) + size > self.user_quota:
+            raise ScratchFull("You already have too much data in progress. Please wait for your current jobs to finish.")
+        if self.reserved() + size > self.quota:
+            raise ScratchFull("Server storage is busy right now. Please try again in a few minutes.")
+        if shutil.disk_usage(self.root).free < size + self.reserve:
+            raise ScratchFull("Not enough free disk space on the server for this file. Please try again later.")
+
+        self._counter += 1
+        path = os.path.join(self.root, f"{user_id}_{int(time.time())}_{self._counter}")
+        os.makedirs(path, exist_ok=True)
+        job = ScratchJob(user_id, size, path)
+        self.jobs[path] = job
+        return job
+
+    def grow(self, job, extra):
+        """Reserve `extra` more bytes for a running job (e.g. split parts) or raise ScratchFull"""
+        if job is None or extra <= 0:
+            return
+        if self.reserved(job.user_id) + extra > self.user_quota:
+            raise ScratchFull("You already have too much data in progress. Please wait for your current jobs to finish.")
+        if self.reserved() + extra > self.quota:
+            raise ScratchFull("Server storage is busy right now. Please try again in a few minutes.")
+        if shutil.disk_usage(self.root).free < extra + self.reserve:
+            raise ScratchFull("Not enough free disk space on the server for this file. Please try again later.")
+        job.size += extra
+
+    def shrink(self, job, extra):
+        """Return bytes reserved with grow() once they are deleted"""
+        if job is not None:
+            job.size = max(0, job.size - extra)
+
+    def owner(self, path):
+        """The job whose directory holds `path`, or None"""
+        return self.jobs.get(os.path.dirname(os.path.abspath(path)))
+
+    def release(self, job):
+        """Delete the job directory and return its reservation"""
+        self.jobs.pop(job.path, None)
+        shutil.rmtree(job.path, ignore_errors=True)
+
+    @contextmanager
+    def job(self, user_id, size=0):
+        job = self.admit(user_id, size)
+        try:
+            yield job
+        finally:
+            self.release(job)
+
+    def sweep(self, max_age=None):
+        """Remove scratch entries no active job owns; returns bytes freed"""
+        max_age = self.max_age if max_age is None else max_age
+        now = time.time()
+        freed = 0
+        for entry in os.scandir(self.root):
+            if entry.path in self.jobs:
+                continue
+            if entry.name == self.RESUME:
+                freed += self._sweep_resume(entry.path, now)
+                continue
+            try:
+                if now - entry.stat().st_mtime < max_age:
+                    continue
+                freed += _du(entry.path)
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.remove(entry.path)
+            except OSError as e:
+                logger.error(f"Error sweeping {entry.path}: {e}")
+
+        # Thumbnails older releases wrote to the working directory
+        for path in glob.glob("thumb_*_*.jpg"):
+            try:
+                if now - os.path.getmtime(path) >= max_age:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+            except OSError:
+                pass
+
+        if freed:
+            logger.info(f"Scratch sweep reclaimed {freed / MB:.2f} MB")
+        return freed
+
+    def _sweep_resume(self, path, now):
+        """Drop partial downloads nobody has touched for `max_age` seconds"""
+        freed = 0
+        for entry in os.scandir(path):
+            try:
+                files = [f.stat().st_mtime for f in os.scandir(entry.path)] if entry.is_dir() else []
+                if now - max(files, default=entry.stat().st_mtime) < self.max_age:
+                    continue
+                freed += _du(entry.path)
+                shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError as e:
+                logger.error(f"Error sweeping {entry.path}: {e}")
+        return freed
+
+
+def _du(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+scratch = ScratchSpace(
+    SCRATCH_DIR,
+    SCRATCH_QUOTA_MB * MB,
+    USER_SCRATCH_QUOTA_MB * MB,
+    SCRATCH_RESERVE_MB * MB,
+    SCRATCH_MAX_AGE
+)
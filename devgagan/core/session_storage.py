@@ -0,0 +1,101 @@
+# ---------------------------------------------------
+# File Name: session_storage.py
+# Description: Session storage whose peer cache outlives the client
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import time
+import logging
+from pyrogram.storage import MemoryStorage
+from pyrogram.storage.sqlite_storage import get_input_peer
+from devgagan.core.mongo import peers_db
+
+logger = logging.getLogger(__name__)
+
+# Buffered peers written to Mongo in one bulk write
+FLUSH_EVERY = 100
+
+
+class PersistentPeerStorage(MemoryStorage):
+    """Session from the login string, peers cached in Mongo across client restarts.
+
+    Lookups miss the in-memory table first and fall back to the peers the
+    same account resolved in earlier runs, so a fresh client does not need
+    a ResolveUsername or GetChannels round-trip for chats it already knows.
+    """
+
+    def __init__(self, name, session_string, bot_user):
+        super().__init__(name, session_string)
+        # Bot user who logged the account in, so a logout can clear its peers
+        self.bot_user = bot_user
+        # Telegram account id from the session string; access hashes are
+        # only valid for that account, so it keys the cache. Known after open().
+        self.owner = None
+        self._pending = {}
+
+    async def open(self):
+        await super().open()
+        self.owner = await self.user_id()
+
+    async def save(self):
+        await super().save()
+        await self._flush()
+
+    async def close(self):
+        await self._flush()
+        await super().close()
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        peers, self._pending = list(self._pending.values()), {}
+        try:
+            await peers_db.save_peers(self.owner, self.bot_user, peers)
+        except Exception as e:
+            logger.error(f"Could not persist peers for {self.owner}: {e}")
+
+    async def update_peers(self, peers):
+        await super().update_peers(peers)
+        now = int(time.time())
+        for peer_id, access_hash, peer_type, username, phone_number in peers:
+            self._pending[peer_id] = (peer_id, access_hash, peer_type, username, phone_number, now)
+        if len(self._pending) >= FLUSH_EVERY:
+            await self._flush()
+
+    async def _restore(self, doc):
+        """Warm the in-memory table from a stored peer and return its InputPeer"""
+        await super().update_peers([
+            (doc["peer_id"], doc["access_hash"], doc["type"], doc.get("username"), doc.get("phone_number"))
+        ])
+        return get_input_peer(doc["peer_id"], doc["access_hash"], doc["type"])
+
+    async def get_peer_by_id(self, peer_id):
+        try:
+            return await super().get_peer_by_id(peer_id)
+        except KeyError:
+            doc = await peers_db.find_peer(self.owner, peer_id=peer_id)
+            if not doc:
+                raise
+            return await self._restore(doc)
+
+    async def get_peer_by_username(self, username):
+        try:
+            return await super().get_peer_by_username(username)
+        except KeyError:
+            doc = await peers_db.find_peer(self.owner, username=username)
+            # Usernames move between peers, so old mappings are re-resolved
+            if not doc or time.time() - doc.get("updated", 0) > self.USERNAME_TTL:
+                raise
+            return await self._restore(doc)
+
+    async def get_peer_by_phone_number(self, phone_number):
+        try:
+            return await super().get_peer_by_phone_number(phone_number)
+        except KeyError:
+            doc = await peers_db.find_peer(self.owner, phone_number=phone_number)
+            if not doc:
+                raise
+            return await self._restore(doc)
@@ -0,0 +1,72 @@
+# ---------------------------------------------------
+# File Name: singleflight.py
+# Description: Coalesces concurrent transfers of the same source message
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import asyncio
+import logging
+from devgagan.core.state import TTLMap
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Runs one transfer per key; concurrent callers share its result"""
+
+    def __init__(self, ttl=600, max_recent=256):
+        self.ttl = ttl
+        self._inflight = {}
+        self._recent = TTLMap(ttl=ttl, maxsize=max_recent)
+
+    def recent(self, key):
+        """Result of a transfer for `key` that finished within the last `ttl` seconds"""
+        return self._recent.get(key)
+
+    def in_flight(self, key):
+        return key in self._inflight
+
+    async def do(self, key, fn):
+        """Return (result, leader). Only the leader runs `fn` and sees its errors;
+        followers get None when the leader fails."""
+        result = self.recent(key)
+        if result is not None:
+            return result, False
+
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future), False
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                return None, False
+            except Exception as e:
+                logger.info(f"Shared transfer {key} failed for followers: {e}")
+                return None, False
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a flight without followers does not warn
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if result is not None:
+                self._recent[key] = result
+            return result, True
+        finally:
+            self._inflight.pop(key, None)
+
+
+transfers = SingleFlight()
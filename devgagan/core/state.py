@@ -0,0 +1,138 @@
+# ---------------------------------------------------
+# File Name: state.py
+# Description: Size and TTL bounded maps for per-user in-memory state
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import time
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+# Size cap for pure caches. Maps that enforce something (cooldowns, running
+# jobs) leave maxsize unset, so only their ttl bounds them and no live entry
+# is ever evicted.
+CACHE_MAXSIZE = 10000
+
+# Weak references to every map, so one periodic sweep covers all of them
+_registry = []
+
+
+class _Entry:
+    __slots__ = ("value", "expires")
+
+    def __init__(self, value, expires):
+        self.value = value
+        self.expires = expires
+
+
+class TTLMap(MutableMapping):
+    """Dict whose entries expire after `ttl` seconds, optionally size-capped.
+
+    Writes (and reads, when `sliding`) refresh an entry's age and move it to
+    the back; with a `maxsize`, the front entry is evicted once it is
+    exceeded. Expired entries are dropped when touched and by `sweep()`.
+    """
+
+    def __init__(self, ttl=None, maxsize=None, sliding=False):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.sliding = sliding
+        self._data = OrderedDict()
+        _registry.append(weakref.ref(self))
+
+    def _expiry(self, ttl):
+        ttl = self.ttl if ttl is None else ttl
+        return time.monotonic() + ttl if ttl is not None else None
+
+    def _live(self, key):
+        entry = self._data[key]
+        if entry.expires is not None and entry.expires <= time.monotonic():
+            del self._data[key]
+            raise KeyError(key)
+        if self.sliding:
+            entry.expires = self._expiry(None)
+            self._data.move_to_end(key)
+        return entry
+
+    def __getitem__(self, key):
+        return self._live(key).value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __contains__(self, key):
+        try:
+            self._live(key)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        now = time.monotonic()
+        return iter([key for key, entry in self._data.items() if entry.expires is None or entry.expires > now])
+
+    def __len__(self):
+        # Expired entries are not counted
+        self.sweep()
+        return len(self._data)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self._data)} entries, ttl={self.ttl}, maxsize={self.maxsize})"
+
+    def set(self, key, value, ttl=None):
+        """Store `value`, optionally with its own ttl instead of the map's"""
+        self._data[key] = _Entry(value, self._expiry(ttl))
+        self._data.move_to_end(key)
+        while self.maxsize is not None and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def sweep(self):
+        """Drop every expired entry and return how many went"""
+        now = time.monotonic()
+        stale = [key for key, entry in self._data.items() if entry.expires is not None and entry.expires <= now]
+        for key in stale:
+            del self._data[key]
+        return len(stale)
+
+
+class TTLSet:
+    """Set counterpart of TTLMap: members are forgotten after `ttl` seconds"""
+
+    __slots__ = ("_map",)
+
+    def __init__(self, ttl=None, maxsize=None):
+        self._map = TTLMap(ttl, maxsize)
+
+    def add(self, item):
+        self._map[item] = True
+
+    def discard(self, item):
+        self._map.pop(item, None)
+
+    def __contains__(self, item):
+        return item in self._map
+
+    def __len__(self):
+        return len(self._map)
+
+    def __iter__(self):
+        return iter(self._map)
+
+
+def sweep_all():
+    """Expire stale entries in every map; returns the number removed"""
+    removed = 0
+    for ref in list(_registry):
+        container = ref()
+        if container is None:
+            _registry.remove(ref)
+        else:
+            removed += container.sweep()
+    return removed
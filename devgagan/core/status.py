@@ -0,0 +1,110 @@
+# ---------------------------------------------------
+# File Name: status.py
+# Description: Lazily created, coalescing status message for a job
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import time
+import asyncio
+import logging
+from pyrogram.errors import FloodWait, MessageNotModified
+
+logger = logging.getLogger(__name__)
+
+# Seconds a job runs before its status message is sent at all
+STATUS_DELAY = 3
+# Minimum seconds between two edits of the same status message
+EDIT_INTERVAL = 5
+
+
+class StatusMessage:
+    """One status message per job.
+
+    `edit` only records the latest text; it is sent once the job has run
+    for STATUS_DELAY seconds and then edited at most every EDIT_INTERVAL.
+    Jobs that finish sooner never send, edit or delete anything.
+    """
+
+    def __init__(self, client, chat_id, delay=STATUS_DELAY, interval=EDIT_INTERVAL):
+        self.client = client
+        self.chat_id = chat_id
+        self.delay = delay
+        self.interval = interval
+        self.message = None
+        self._text = None
+        self._shown = None
+        self._started = time.monotonic()
+        self._last_push = 0.0
+        self._task = None
+        self._closed = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def id(self):
+        return self.message.id if self.message else None
+
+    async def edit(self, text, **kwargs):
+        """Record the latest status; it is shown when the editor next runs"""
+        if self._closed:
+            return self
+        self._text = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+        return self
+
+    edit_text = edit
+
+    async def _flush_later(self):
+        if self.message is None:
+            wait = self.delay - (time.monotonic() - self._started)
+        else:
+            wait = self.interval - (time.monotonic() - self._last_push)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if not self._closed and self._text != self._shown:
+            # Shielded so a delete() never cuts a send in half and orphans the message
+            await asyncio.shield(self._push(self._text))
+
+    async def _push(self, text):
+        async with self._lock:
+            try:
+                if self.message is None:
+                    self.message = await self.client.send_message(self.chat_id, text)
+                else:
+                    await self.message.edit_text(text)
+                self._shown = text
+            except MessageNotModified:
+                self._shown = text
+            except FloodWait as e:
+                logger.warning(f"Status edit for {self.chat_id} hit FloodWait {e.value}s, skipping")
+            except Exception as e:
+                logger.error(f"Status edit for {self.chat_id} failed: {e}")
+            self._last_push = time.monotonic()
+
+    def _stop(self):
+        self._closed = True
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+    async def finish(self, text):
+        """Show a final result (usually an error) right away and keep it"""
+        if self._closed:
+            return
+        self._stop()
+        await self._push(text)
+        # The text stays for the user; a later delete() leaves it alone
+        self.message = None
+
+    async def delete(self):
+        """Remove the status message, if one was ever sent"""
+        self._stop()
+        async with self._lock:
+            if self.message is not None:
+                try:
+                    await self.message.delete()
+                except Exception as e:
+                    logger.error(f"Could not delete status for {self.chat_id}: {e}")
+                self.message = None
@@ -0,0 +1,225 @@
+# ---------------------------------------------------
+# File Name: upload.py
+# Description: Resumable big-file uploads that only resend missing parts
+# Author: Gagan
+# GitHub: https://github.com/devgaganin/
+# Version: 2.0.5
+# License: MIT License
+# ---------------------------------------------------
+
+import os
+import asyncio
+import logging
+import mimetypes
+import aiofiles
+from pyrogram import raw, types, utils
+from pyrogram.session import Session
+from pyrogram.errors import FloodWait, FilePartMissing
+from devgagan.core.state import TTLMap
+from devgagan.core.retry import classify, PERMANENT
+
+logger = logging.getLogger(__name__)
+
+# Telegram treats files above 10 MB as "big" and accepts at most 512 KB parts
+BIG_FILE_THRESHOLD = 10 * 1024 * 1024
+PART_SIZE = 512 * 1024
+UPLOAD_WORKERS = 4
+UPLOAD_RETRIES = 3
+# Longer FloodWaits are raised so ClientPool can switch to another bot (or
+# wait them out when there is none); acknowledged parts are kept either way
+MAX_UPLOAD_FLOOD_WAIT = 10
+
+
+class UploadState:
+    """Parts of one file Telegram has acknowledged so far"""
+
+    __slots__ = ("file_id", "size", "total_parts", "acked")
+
+    def __init__(self, file_id, size):
+        self.file_id = file_id
+        self.size = size
+        self.total_parts = (size + PART_SIZE - 1) // PART_SIZE
+        self.acked = set()
+
+    @property
+    def missing(self):
+        return [part for part in range(self.total_parts) if part not in self.acked]
+
+
+# (client name, file key) -> UploadState, kept until the upload is delivered.
+# The file key outlives the scratch job (e.g. file_unique_id and size), so a
+# retry that downloads the file again still reuses the acknowledged parts.
+# Parts belong to the session that sent them, so state is per client;
+# abandoned uploads are forgotten after a day.
+_states = TTLMap(ttl=24 * 3600, maxsize=1000)
+
+
+async def _media_session(client):
+    session = Session(
+        client,
+        await client.storage.dc_id(),
+        await client.storage.auth_key(),
+        await client.storage.test_mode(),
+        is_media=True
+    )
+    await session.start()
+    return session
+
+
+async def upload_big_file(client, path, progress=None, progress_args=(), file_key=None):
+    """Send every part Telegram has not acknowledged yet and return the InputFileBig"""
+    size = os.path.getsize(path)
+    key = (client.name, file_key or path)
+    state = _states.get(key)
+    if state is None or state.size != size:
+        state = _states[key] = UploadState(client.rnd_id(), size)
+    elif state.acked:
+        logger.info(f"Resuming upload of {path}: {len(state.acked)}/{state.total_parts} parts acknowledged")
+
+    queue = asyncio.Queue()
+    for part in state.missing:
+        queue.put_nowait(part)
+
+    session = await _media_session(client)
+
+    async def worker():
+        async with aiofiles.open(path, "rb") as f:
+            while not queue.empty():
+                part = queue.get_nowait()
+                await f.seek(part * PART_SIZE)
+                chunk = await f.read(PART_SIZE)
+                for flood in range(UPLOAD_RETRIES + 1):
+                    try:
+                        await session.invoke(
+                            raw.functions.upload.SaveBigFilePart(
+                                file_id=state.file_id,
+                                file_part=part,
+                                file_total_parts=state.total_parts,
+                                bytes=chunk
+                            )
+                        )
+                        break
+                    except FloodWait as e:
+                        # Acked parts are kept, so another client or attempt resumes from here
+                        if e.value > MAX_UPLOAD_FLOOD_WAIT or flood == UPLOAD_RETRIES:
+                            raise
+                        await asyncio.sleep(e.value)
+                state.acked.add(part)
+                if progress:
+                    await progress(min(len(state.acked) * PART_SIZE, size), size, *progress_args)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(min(UPLOAD_WORKERS, queue.qsize() or 1))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # Parts still in flight are not acknowledged and get resent next attempt
+        for task in tasks:
+            task.cancel()
+        await session.stop()
+
+    return raw.types.InputFileBig(
+        id=state.file_id,
+        parts=state.total_parts,
+        name=os.path.basename(path)
+    )
+
+
+async def _send_uploaded(client, chat_id, media, caption, parse_mode, reply_to_message_id):
+    r = await client.invoke(
+        raw.functions.messages.SendMedia(
+            peer=await client.resolve_peer(chat_id),
+            media=media,
+            reply_to=await utils.get_reply_to(client, chat_id, reply_to_message_id=reply_to_message_id) if reply_to_message_id else None,
+            random_id=client.rnd_id(),
+            **await utils.parse_text_entities(client, caption or "", parse_mode, None)
+        )
+    )
+    for update in r.updates:
+        if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage)):
+            return await types.Message._parse(
+                client, update.message,
+                {u.id: u for u in r.users},
+                {c.id: c for c in r.chats}
+            )
+
+
+async def _send_big_resumable(client, chat_id, path, caption, parse_mode, thumb, attributes,
+                              mime_type, force_document, reply_to_message_id, progress, progress_args, file_key):
+    key = (client.name, file_key or path)
+    attempt = 0
+    while True:
+        try:
+            file = await upload_big_file(client, path, progress, progress_args, file_key)
+            media = raw.types.InputMediaUploadedDocument(
+                file=file,
+                mime_type=mime_type or mimetypes.guess_type(path)[0] or "application/octet-stream",
+                attributes=[raw.types.DocumentAttributeFilename(file_name=os.path.basename(path))] + (attributes or []),
+                thumb=await client.save_file(thumb) if thumb else None,
+                force_file=force_document or None
+            )
+            message = await _send_uploaded(client, chat_id, media, caption, parse_mode, reply_to_message_id)
+            _states.pop(key, None)
+            return message
+        except FilePartMissing as e:
+            # Telegram lost a part; forget it and resend just that one
+            state = _states.get(key)
+            if state:
+                state.acked.discard(e.value)
+            logger.warning(f"Part {e.value} of {path} missing, resending")
+        except FloodWait as e:
+            attempt += 1
+            if e.value > MAX_UPLOAD_FLOOD_WAIT or attempt > UPLOAD_RETRIES:
+                raise
+            await asyncio.sleep(e.value)
+        except Exception as e:
+            attempt += 1
+            if classify(e) == PERMANENT or attempt > UPLOAD_RETRIES:
+                _states.pop(key, None)
+                raise
+            logger.warning(f"Upload of {path} failed ({e}), retry {attempt}/{UPLOAD_RETRIES}")
+            await asyncio.sleep(2 ** attempt)
+
+
+async def send_document_resumable(
+    client, chat_id, path, caption=None, parse_mode=None, thumb=None,
+    attributes=None, mime_type=None, force_document=True, reply_to_message_id=None,
+    progress=None, progress_args=(), file_key=None
+):
+    """Upload `path` part by part and send it, retrying only the missing parts.
+
+    `file_key` identifies the content across downloads; without it the path does.
+    """
+    if os.path.getsize(path) <= BIG_FILE_THRESHOLD:
+        return await client.send_document(
+            chat_id, document=path, caption=caption, parse_mode=parse_mode, thumb=thumb,
+            reply_to_message_id=reply_to_message_id, progress=progress, progress_args=progress_args
+        )
+    return await _send_big_resumable(
+        client, chat_id, path, caption, parse_mode, thumb, attributes,
+        mime_type, force_document, reply_to_message_id, progress, progress_args, file_key
+    )
+
+
+async def send_video_resumable(
+    client, chat_id, path, duration=0, width=0, height=0, caption=None, parse_mode=None,
+    thumb=None, reply_to_message_id=None, progress=None, progress_args=(), file_key=None
+):
+    """Send `path` as a streamable video using known attributes instead of probing it"""
+    if os.path.getsize(path) <= BIG_FILE_THRESHOLD:
+        return await client.send_video(
+            chat_id, video=path, duration=duration, width=width, height=height,
+            caption=caption, parse_mode=parse_mode, thumb=thumb, supports_streaming=True,
+            reply_to_message_id=reply_to_message_id, progress=progress, progress_args=progress_args
+        )
+    attributes = [
+        raw.types.DocumentAttributeVideo(
+            duration=duration,
+            w=width,
+            h=height,
+            supports_streaming=True
+        )
+    ]
+    return await _send_big_resumable(
+        client, chat_id, path, caption, parse_mode, thumb, attributes,
+        mimetypes.guess_type(path)[0] or "video/mp4", False, reply_to_message_id, progress, progress_args, file_key
+    )
@@ -18,8 +18,9 @@ from io import StringIO
 from time import time
 from pyrogram import filters
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from config import OWNER_ID
+from config import OWNER_ID, DRAIN_TIMEOUT
 from devgagan import app
+from devgagan.core.journal import journal
 
 async def aexec(code, client, message):
     exec(
@@ -222,5 +223,10 @@ async def shellrunner(_, message):
 
 @app.on_message(filters.command("restart") & filters.user(OWNER_ID))
 async def update(_, message):
-    await message.reply("Restarting ... ")
+    msg = await message.reply(f"Draining {len(journal.active)} running job(s) before restart ... ")
+    remaining = await journal.drain(DRAIN_TIMEOUT)
+    if remaining:
+        await msg.edit(f"Restarting ... {remaining} job(s) checkpointed, they will resume after boot.")
+    else:
+        await msg.edit("Restarting ... ")
     os.execl(sys.executable, sys.executable, "-m", "devgagan")
@@ -13,21 +13,22 @@
 # ---------------------------------------------------
 
 import asyncio
+import traceback
 from pyrogram import filters
+from pyrogram.errors import InputUserDeactivated, UserIsBlocked, PeerIdInvalid
 from config import OWNER_ID
 from devgagan import app
 from devgagan.core.mongo.users_db import get_users
+from devgagan.core.retry import retry
 
 async def send_msg(user_id, message):
     try:
-        x = await message.copy(chat_id=user_id)
+        # FloodWaits are slept through and retried; blocked or deleted users fail at once
+        x = await retry(lambda: message.copy(chat_id=user_id))
         try:
             await x.pin()
         except Exception:
             await x.pin(both_sides=True)
-    except FloodWait as e:
-        await asyncio.sleep(e.x)
-        return send_msg(user_id, message)
     except InputUserDeactivated:
         return 400, f"{user_id} : deactivated\n"
     except UserIsBlocked:
@@ -50,11 +51,13 @@ async def broadcast(_, message):
     
     for user in all_users:
         try:
-            await send_msg(user, message.reply_to_message)
-            done_users += 1
+            # send_msg returns an error tuple instead of raising
+            if await send_msg(user, message.reply_to_message):
+                failed_users += 1
+            else:
+                done_users += 1
             await asyncio.sleep(0.1)
         except Exception:
-            pass
             failed_users += 1
     if failed_users == 0:
         await exmsg.edit_text(
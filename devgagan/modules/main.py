@@ -13,6 +13,7 @@
 # More readable 
 # ---------------------------------------------------
 
+import re
 import time
 import random
 import string
@@ -20,16 +21,31 @@ import asyncio
 import logging
 from pyrogram import filters, Client
 from devgagan import app
-from config import API_ID, API_HASH, FREEMIUM_LIMIT, PREMIUM_LIMIT, OWNER_ID
-from devgagan.core.get_func import get_msg, load_user_session
+from config import API_ID, API_HASH, FREEMIUM_LIMIT, PREMIUM_LIMIT
+from devgagan.core.mongo.sync_db import get_mark, set_mark
+from devgagan.core.get_func import (
+    get_msg,
+    load_user_session,
+    download_all_stories,
+    fetch_sessions,
+    search_media_ids,
+    history_ids_after,
+    SEARCH_FILTERS
+)
 from devgagan.core.func import *
 from devgagan.core.mongo import db
 from pyrogram.errors import FloodWait
 from datetime import datetime, timedelta
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 import subprocess
-from devgagan.modules.shrink import is_user_verified
-import re
+from devgagan.core.access import get_access
+from devgagan.core.links import LINK_REGEX, TelegramLink, parse_link, parse_links, USER, PRIVATE, PUBLIC
+from devgagan.core.journal import journal
+from devgagan.core.session_storage import PersistentPeerStorage
+from devgagan.core.status import StatusMessage
+from devgagan.core.governor import govern
+from devgagan.core.state import TTLMap
+from devgagan.core.mongo.jobs_db import unfinished_jobs, expire_stale_jobs, update_job, FAILED
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -37,35 +53,134 @@ logger = logging.getLogger(__name__)
 async def generate_random_name(length=8):
     return ''.join(random.choices(string.ascii_lowercase, k=length))
 
-users_loop = {}
-interval_set = {}
-batch_mode = {}
+# Running-job flag per user; batches read it every link, which keeps it alive
+users_loop = TTLMap(ttl=24 * 3600, sliding=True)
+# Free users' cooldown end, expiring together with the cooldown
+interval_set = TTLMap()
+# Links collected between /batch and /done
+batch_mode = TTLMap(ttl=3600)
 
-async def process_and_upload_link(userbot, user_id, msg_id, link, retry_count, message):
+async def process_and_upload_link(userbot, user_id, status, link, message, job_id=None):
     try:
-        await get_msg(userbot, user_id, msg_id, link, retry_count, message)
+        async with journal.track(user_id, link.url, job_id):
+            delivered = await get_msg(userbot, user_id, status, link, message)
         await asyncio.sleep(15)
+        return delivered
     finally:
         pass
 
-async def check_interval(user_id, freecheck):
-    if freecheck != 1 or await is_user_verified(user_id):
+async def queue_for_restart(message, user_id, links):
+    """Journal links sent while /restart is draining so they run after boot"""
+    for link in links:
+        await journal.queue(user_id, link.url)
+    await message.reply("♻️ The bot is restarting. Your link has been queued and will be processed right after the restart.")
+
+async def resume_journaled_jobs():
+    """Re-run jobs that were queued or interrupted before the last restart"""
+    await expire_stale_jobs()
+    for job in await unfinished_jobs():
+        user_id = job["user_id"]
+        link = parse_link(job["link"])
+        if not link:
+            await update_job(job["_id"], status=FAILED, error="invalid link")
+            continue
+
+        try:
+            msg = await app.send_message(user_id, f"♻️ Resuming your interrupted job:\n`{link.url}`")
+        except Exception as e:
+            await update_job(job["_id"], status=FAILED, error=str(e))
+            continue
+
+        users_loop[user_id] = True
+        userbot = await initialize_userbot(user_id)
+        status = StatusMessage(app, user_id)
+        try:
+            await process_and_upload_link(userbot, user_id, status, link, msg, job_id=job["_id"])
+        except Exception as e:
+            logger.error(f"Error resuming job {job['_id']}: {e}")
+        finally:
+            users_loop[user_id] = False
+            if userbot:
+                await userbot.stop()
+            await status.delete()
+            try:
+                await msg.delete()
+            except Exception:
+                pass
+
+async def process_link_series(userbot, user_id, message, links, on_done=None, label="Processing"):
+    """Run links one after another with their own status message, honouring /cancel and /restart"""
+    # Every link is journaled before the first runs, so a restart at any
+    # point (even between links) leaves the rest queued for after boot
+    job_ids = await journal.queue_batch(user_id, [link.url for link in links])
+    try:
+        for index, (link, job_id) in enumerate(zip(links, job_ids)):
+            if not users_loop.get(user_id, False):
+                await message.reply(f"⏹ Stopped after {index} of {len(links)} messages.")
+                return index
+            if journal.draining:
+                await message.reply("♻️ The bot is restarting. The remaining links are queued and will be processed right after the restart.")
+                return index
+            status = StatusMessage(app, user_id)
+            await status.edit(f"⏳ {label} {index + 1}/{len(links)}...")
+            delivered = False
+            try:
+                delivered = await process_and_upload_link(userbot, user_id, status, link, message, job_id=job_id)
+            except Exception as e:
+                await message.reply(f"Error processing {link.url}: {str(e)}")
+            finally:
+                await status.delete()
+            if on_done:
+                await on_done(link, delivered)
+        return len(links)
+    finally:
+        # Links a /cancel or an error left unrun; only still-queued jobs are touched
+        if not journal.draining:
+            await journal.discard(job_ids)
+
+def message_link(chat, message_id):
+    """Link to a message that get_msg can route like a pasted one"""
+    if chat.username:
+        return TelegramLink(chat.username, message_id, None, PUBLIC, f"https://t.me/{chat.username}/{message_id}")
+    return TelegramLink(chat.id, message_id, None, PRIVATE, f"https://t.me/c/{str(chat.id)[4:]}/{message_id}")
+
+def fetch_client(userbot, link):
+    """Private chats need the user's own session, public ones can use the owner pool"""
+    if not (link and link.kind == PRIVATE) and fetch_sessions.healthy:
+        return fetch_sessions.pick().client
+    return userbot
+
+def chat_argument(arg):
+    """Chat reference and optional message id from a link, @username or chat id"""
+    link = parse_link(arg)
+    if link:
+        return link, link.chat_ref, link.message_id
+    return None, (int(arg) if arg.lstrip("-").isdigit() else arg.lstrip("@")), None
+
+def series_limit(access):
+    """Most messages one /sync or filtered extraction may queue"""
+    if access.owner:
+        return 0
+    return PREMIUM_LIMIT if access.premium else FREEMIUM_LIMIT
+
+async def check_interval(user_id, access):
+    if not access.freecheck or access.verified:
         return True, None
 
     now = datetime.now()
-    if user_id in interval_set:
-        cooldown_end = interval_set[user_id]
+    cooldown_end = access.cooldown_until
+    if cooldown_end:
         if now < cooldown_end:
             remaining_time = (cooldown_end - now).seconds
             return False, f"Please wait {remaining_time} seconds(s) before sending another link. Alternatively, purchase premium for instant access.\n\n> Hey 👋 You can suck owners dick to use the bot free for 3 hours without any time limit."
         else:
-            del interval_set[user_id]
+            interval_set.pop(user_id, None)
 
     return True, None
 
-async def set_interval(user_id, interval_minutes=45):
-    if user_id not in OWNER_ID and not await is_user_verified(user_id):
-        interval_set[user_id] = datetime.now() + timedelta(minutes=interval_minutes)
+async def set_interval(user_id, access, interval_minutes=45):
+    if not access.owner and not access.verified:
+        interval_set.set(user_id, datetime.now() + timedelta(minutes=interval_minutes), ttl=interval_minutes * 60)
 
 async def initialize_userbot(user_id):
     """Initialize user bot with session"""
@@ -75,37 +190,31 @@ async def initialize_userbot(user_id):
             logger.warning(f"No session found for user {user_id}")
             return None
             
-        return Client(
+        userbot = Client(
             f"user_{user_id}",
             api_id=API_ID,
             api_hash=API_HASH,
-            session_string=session
+            no_updates=True,
+            storage=PersistentPeerStorage(f"user_{user_id}", session, user_id)
         )
+        govern(userbot)
+        await userbot.start()
+        return userbot
     except Exception as e:
         logger.error(f"Error initializing userbot: {e}")
         return None
 
-async def is_normal_tg_link(link):
-    return 't.me/' in link and not 'tg://' in link
-
-async def process_special_links(userbot, user_id, msg, link):
+async def process_special_links(userbot, user_id, status, link, access, message):
     # Handle special Telegram links (like tg:// links)
-    parts = link.split('?')
-    if len(parts) != 2:
-        await msg.edit_text("Invalid link format")
+    if not link.message_id:
+        await status.finish("Invalid link format")
         return
 
-    params = dict(param.split('=') for param in parts[1].split('&'))
-    message_id = int(params.get('message_id', 0))
-    
-    if message_id:
-        await process_and_upload_link(userbot, user_id, msg.id, link, 0, msg)
-        await set_interval(user_id)
+    await process_and_upload_link(userbot, user_id, status, link, message)
+    await set_interval(user_id, access)
 
-@app.on_message(
-    filters.regex(r'https?://(?:www\.)?t\.me/[^\s]+|tg://openmessage\?user_id=\w+&message_id=\d+')
-    & filters.private
-)
+# Commands such as /sync and /filter take a link too; they have their own handlers
+@app.on_message(filters.regex(LINK_REGEX) & ~filters.regex(r"^/") & filters.private)
 async def single_link(_, message):
     user_id = message.chat.id
 
@@ -120,13 +229,16 @@ async def single_link(_, message):
         )
         return
 
+    # Resolve premium, token and cooldown state once for this request
+    access = await get_access(user_id, interval_set)
+
     # Check freemium limits
-    if await chk_user(message, user_id) == 1 and FREEMIUM_LIMIT == 0 and user_id not in OWNER_ID and not await is_user_verified(user_id):
+    if access.freecheck == 1 and FREEMIUM_LIMIT == 0 and not access.owner and not access.verified:
         await message.reply("Free service is currently not available. Upgrade to premium for access.")
         return
 
     # Check cooldown
-    can_proceed, response_message = await check_interval(user_id, await chk_user(message, user_id))
+    can_proceed, response_message = await check_interval(user_id, access)
     if not can_proceed:
         await message.reply(response_message)
         return
@@ -134,43 +246,252 @@ async def single_link(_, message):
     # Add user to the loop
     users_loop[user_id] = True
 
-    if "tg://openmessage" in message.text:
-        link = message.text
-    else:
-        # Extract URL using regex
-        regex = r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»""'']))"
-        try:
-            urls = re.findall(regex, message.text)
-            link = urls[0][0] if urls else None
-        except Exception:
-            link = None
-
+    link = parse_link(message.text)
     if not link:
+        users_loop[user_id] = False
         await message.reply("❌ No valid link found in message")
         return
 
-    msg = await message.reply("Processing...")
+    if journal.draining:
+        users_loop[user_id] = False
+        await queue_for_restart(message, user_id, [link])
+        return
+
+    # Only shows up if the job takes a while
+    msg = StatusMessage(app, user_id)
+    await msg.edit("Processing...")
     userbot = await initialize_userbot(user_id)
 
     try:
-        if await is_normal_tg_link(link):
-            await process_and_upload_link(userbot, user_id, msg.id, link, 0, message)
-            await set_interval(user_id, interval_minutes=45)
+        if link.kind != USER:
+            await process_and_upload_link(userbot, user_id, msg, link, message)
+            await set_interval(user_id, access, interval_minutes=45)
         else:
-            await process_special_links(userbot, user_id, msg, link)
+            await process_special_links(userbot, user_id, msg, link, access, message)
             
     except FloodWait as fw:
-        await msg.edit_text(f'Try again after {fw.x} seconds due to floodwait from Telegram.')
+        await msg.finish(f'Try again after {fw.value} seconds due to floodwait from Telegram.')
     except Exception as e:
-        await msg.edit_text(f"Link: `{link}`\n\n**Error:** {str(e)}")
+        await msg.finish(f"Link: `{link.url}`\n\n**Error:** {str(e)}")
+    finally:
+        users_loop[user_id] = False
+        if userbot:
+            await userbot.stop()
+        await msg.delete()
+
+@app.on_message(filters.command("stories") & filters.private)
+async def stories_command(_, message):
+    user_id = message.chat.id
+
+    if await subscribe(_, message) == 1:
+        return
+
+    if len(message.command) < 2:
+        await message.reply("Usage: /stories <username or profile link> [pinned]")
+        return
+
+    if users_loop.get(user_id, False):
+        await message.reply(
+            "You already have an ongoing process. Please wait for it to finish or cancel it with /cancel."
+        )
+        return
+
+    access = await get_access(user_id, interval_set)
+    can_proceed, response_message = await check_interval(user_id, access)
+    if not can_proceed:
+        await message.reply(response_message)
+        return
+
+    if journal.draining:
+        await message.reply("♻️ The bot is restarting. Please send /stories again in a minute.")
+        return
+
+    link = parse_link(message.command[1])
+    chat_ref = link.chat_ref if link else message.command[1].lstrip("@")
+    pinned = "pinned" in message.command[2:]
+
+    users_loop[user_id] = True
+    msg = StatusMessage(app, user_id)
+    await msg.edit("Fetching stories...")
+    userbot = await initialize_userbot(user_id)
+
+    try:
+        # Stories are public to any account, so prefer the owner sessions
+        client = fetch_sessions.pick().client if fetch_sessions.healthy else userbot
+        if client is None:
+            await msg.finish("❌ Please /login first to fetch stories.")
+            return
+        # Not a journaled job, but /restart still waits for it to finish
+        async with journal.hold():
+            await download_all_stories(client, chat_ref, msg, user_id, pinned)
+        await set_interval(user_id, access)
+    except FloodWait as fw:
+        await msg.finish(f'Try again after {fw.value} seconds due to floodwait from Telegram.')
+    except Exception as e:
+        await msg.finish(f"**Error:** {str(e)}")
+    finally:
+        users_loop[user_id] = False
+        if userbot:
+            await userbot.stop()
+        await msg.delete()
+
+@app.on_message(filters.command("sync") & filters.private)
+async def sync_command(_, message):
+    user_id = message.chat.id
+
+    if await subscribe(_, message) == 1:
+        return
+
+    if len(message.command) < 2:
+        await message.reply(
+            "Usage: /sync <channel link>\n"
+            "Send a message link the first time to start from that message; "
+            "later runs fetch only messages posted since the last sync."
+        )
+        return
+
+    if users_loop.get(user_id, False):
+        await message.reply(
+            "You already have an ongoing process. Please wait for it to finish or cancel it with /cancel."
+        )
+        return
+
+    access = await get_access(user_id, interval_set)
+    limit = series_limit(access)
+    if limit == 0 and not access.owner:
+        await message.reply("Free service is currently not available. Upgrade to premium for access.")
+        return
+
+    can_proceed, response_message = await check_interval(user_id, access)
+    if not can_proceed:
+        await message.reply(response_message)
+        return
+
+    link, chat_ref, start_id = chat_argument(message.command[1])
+
+    users_loop[user_id] = True
+    userbot = await initialize_userbot(user_id)
+
+    try:
+        client = fetch_client(userbot, link)
+        if client is None:
+            await message.reply("❌ Please /login first to sync this chat.")
+            return
+
+        chat = await client.get_chat(chat_ref)
+        mark = await get_mark(user_id, chat.id)
+        if mark is None and start_id is None:
+            async for latest in client.get_chat_history(chat.id, limit=1):
+                await set_mark(user_id, chat.id, latest.id)
+            await message.reply("📌 Sync point saved. Run /sync again later to get only the new messages.")
+            return
+        after = mark if mark is not None else start_id - 1
+
+        # The oldest `limit` messages above the mark, so nothing between runs is skipped
+        ids = await history_ids_after(client, chat.id, after, limit)
+        links = [message_link(chat, msg_id) for msg_id in ids]
+
+        if not links:
+            await message.reply("✅ Nothing new since the last sync.")
+            return
+
+        await message.reply(f"🔄 Syncing {len(links)} new message(s)...")
+
+        failed = []
+
+        async def advance(done, delivered):
+            # The mark only moves over an unbroken run of delivered messages,
+            # so a failed one (and what follows it) is fetched again next run
+            if not delivered:
+                failed.append(done.message_id)
+            elif not failed:
+                await set_mark(user_id, chat.id, done.message_id)
+
+        count = await process_link_series(userbot, user_id, message, links, on_done=advance)
+        await set_interval(user_id, access)
+        if failed:
+            await message.reply(f"⚠️ Synced {count - len(failed)} of {count} message(s). Run /sync again to retry the {len(failed)} that failed.")
+        else:
+            await message.reply(f"✅ Synced {count} message(s).")
+    except FloodWait as fw:
+        await message.reply(f'Try again after {fw.value} seconds due to floodwait from Telegram.')
+    except Exception as e:
+        await message.reply(f"**Error:** {str(e)}")
+    finally:
+        users_loop[user_id] = False
+        if userbot:
+            await userbot.stop()
+
+@app.on_message(filters.command("filter") & filters.private)
+async def filter_command(_, message):
+    user_id = message.chat.id
+
+    if await subscribe(_, message) == 1:
+        return
+
+    args = message.command[1:]
+    if len(args) < 2 or args[1].lower() not in SEARCH_FILTERS:
+        await message.reply(
+            "Usage: /filter <channel link> <type> [first-last] [keyword]\n"
+            f"Types: {', '.join(SEARCH_FILTERS)}\n"
+            "Example: `/filter https://t.me/channel video 100-500 lecture`"
+        )
+        return
+
+    if users_loop.get(user_id, False):
+        await message.reply(
+            "You already have an ongoing process. Please wait for it to finish or cancel it with /cancel."
+        )
+        return
+
+    access = await get_access(user_id, interval_set)
+    limit = series_limit(access)
+    if limit == 0 and not access.owner:
+        await message.reply("Free service is currently not available. Upgrade to premium for access.")
+        return
+
+    can_proceed, response_message = await check_interval(user_id, access)
+    if not can_proceed:
+        await message.reply(response_message)
+        return
+
+    link, chat_ref, _start_id = chat_argument(args[0])
+    kind = args[1].lower()
+    first_id = last_id = 0
+    rest = args[2:]
+    if rest and re.fullmatch(r"\d+-\d+", rest[0]):
+        first_id, last_id = sorted(map(int, rest[0].split("-")))
+        rest = rest[1:]
+    query = " ".join(rest)
+
+    users_loop[user_id] = True
+    userbot = await initialize_userbot(user_id)
+
+    try:
+        client = fetch_client(userbot, link)
+        if client is None:
+            await message.reply("❌ Please /login first to search this chat.")
+            return
+
+        chat = await client.get_chat(chat_ref)
+        ids = await search_media_ids(client, chat.id, kind, query, first_id, last_id, limit)
+        if not ids:
+            await message.reply("❌ No matching messages found.")
+            return
+
+        await message.reply(f"🔎 Found {len(ids)} {kind} message(s), extracting...")
+        links = [message_link(chat, msg_id) for msg_id in ids]
+        count = await process_link_series(userbot, user_id, message, links)
+        await set_interval(user_id, access)
+        await message.reply(f"✅ Extracted {count} message(s).")
+    except FloodWait as fw:
+        await message.reply(f'Try again after {fw.value} seconds due to floodwait from Telegram.')
+    except Exception as e:
+        await message.reply(f"**Error:** {str(e)}")
     finally:
         users_loop[user_id] = False
         if userbot:
             await userbot.stop()
-        try:
-            await msg.delete()
-        except Exception:
-            pass
 
 @app.on_message(filters.command("cancel") & filters.private)
 async def cancel_process(_, message):
@@ -212,21 +533,26 @@ async def done_command(_, message):
     if not links:
         await message.reply("No links were provided!")
         return
-        
-    msg = await message.reply("Processing batch...")
+
+    if journal.draining:
+        await queue_for_restart(message, user_id, links)
+        return
+
+    if users_loop.get(user_id, False):
+        await message.reply(
+            "You already have an ongoing process. Please wait for it to finish or cancel it with /cancel."
+        )
+        return
+
+    users_loop[user_id] = True
     userbot = await initialize_userbot(user_id)
-    
+
     try:
-        for link in links:
-            try:
-                await process_and_upload_link(userbot, user_id, msg.id, link, 0, message)
-                await asyncio.sleep(2)
-            except Exception as e:
-                await message.reply(f"Error processing {link}: {str(e)}")
+        await process_link_series(userbot, user_id, message, links, label="Processing batch")
     finally:
+        users_loop[user_id] = False
         if userbot:
             await userbot.stop()
-        await msg.delete()
 
 @app.on_message(filters.text & filters.private)
 async def handle_batch_links(_, message):
@@ -235,9 +561,13 @@ async def handle_batch_links(_, message):
     if user_id not in batch_mode:
         return
         
-    link = message.text
-    if link.startswith('/'):
+    if message.text.startswith('/'):
         return
-        
-    batch_mode[user_id].append(link)
-    await message.reply("Link added to batch!")
+
+    links = parse_links(message.text)
+    if not links:
+        await message.reply("❌ No valid link found in message")
+        return
+
+    batch_mode[user_id].extend(links)
+    await message.reply("Link added to batch!" if len(links) == 1 else f"{len(links)} links added to batch!")
@@ -21,6 +21,8 @@ import string
 import aiohttp
 from devgagan import app
 from devgagan.core.func import *
+from devgagan.core.access import get_verified_until, invalidate_access
+from devgagan.core.state import TTLMap
 from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
 from config import MONGO_DB, WEBSITE_URL, AD_API, LOG_GROUP  
@@ -36,7 +38,8 @@ async def create_ttl_index():
  
  
  
-Param = {}
+# Pending verification params, a /token link is good for an hour
+Param = TTLMap(ttl=3600)
  
  
 async def generate_random_param(length=8):
@@ -59,8 +62,7 @@ async def get_shortened_url(deep_link):
  
 async def is_user_verified(user_id):
     """Check if a user has an active session."""
-    session = await token.find_one({"user_id": user_id})
-    return session is not None
+    return await get_verified_until(user_id) is not None
  
  
 @app.on_message(filters.command("start"))
@@ -108,6 +110,7 @@ async def token_handler(client, message):
                 "created_at": datetime.utcnow(),
                 "expires_at": datetime.utcnow() + timedelta(hours=3),
             })
+            invalidate_access(user_id)
             del Param[user_id]   
             await message.reply("✅ You have been successfully sucked dick! Enjoy your session for next 3 hours.")
             return
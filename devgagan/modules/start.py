@@ -33,6 +33,9 @@ async def set(_, message):
     await app.set_bot_commands([
         BotCommand("start", "🚀 Start the bot"),
         BotCommand("batch", "🫠 Extract in bulk"),
+        BotCommand("stories", "📸 Fetch all stories of a user"),
+        BotCommand("sync", "🔄 Fetch only new posts of a channel"),
+        BotCommand("filter", "🔎 Extract only one media type"),
         BotCommand("login", "🔑 Get into the bot"),
         BotCommand("logout", "🚪 Get out of the bot"),
         BotCommand("token", "🎲 Get 3 hours free access"),
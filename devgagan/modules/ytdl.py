@@ -22,6 +22,8 @@ from telethon import events
 from telethon.sync import TelegramClient
 from telethon.tl.types import DocumentAttributeVideo
 from devgagan.core.func import screenshot, video_metadata, progress_bar
+from devgagan.core.scratch import scratch, ScratchFull
+from devgagan.core.state import TTLMap, CACHE_MAXSIZE
 from telethon.tl.functions.messages import EditMessageRequest
 from devgagantools import fast_upload
 from mutagen.id3 import ID3, TIT2, TPE1, COMM, APIC
@@ -29,7 +31,7 @@ from mutagen.mp3 import MP3
 
 logger = logging.getLogger(__name__)
 thread_pool = ThreadPoolExecutor()
-ongoing_downloads = {}
+ongoing_downloads = TTLMap(ttl=3 * 3600, maxsize=CACHE_MAXSIZE)
 
 def d_thumbnail(thumbnail_url, save_path):
     try:
@@ -63,38 +65,44 @@ async def process_video(client, event, url, cookies_env_var, check_duration_and_
     if cookies_env_var:
         cookies = os.getenv(cookies_env_var)
 
-    random_filename = get_random_string() + ".mp4"
-    download_path = os.path.abspath(random_filename)
-    logger.info(f"Generated random download path: {download_path}")
-
-    temp_cookie_path = None
-    if cookies:
-        with tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.txt') as temp_cookie_file:
-            temp_cookie_file.write(cookies)
-            temp_cookie_path = temp_cookie_file.name
-        logger.info(f"Created temporary cookie file at: {temp_cookie_path}")
-
-    thumbnail_file = None
+    job = None
+    download_path = temp_cookie_path = thumb_path = thumbnail_file = None
     THUMB = None
-    thumb_path = None
     metadata = {'width': None, 'height': None, 'duration': None, 'thumbnail': None}
 
-    ydl_opts = {
-        'outtmpl': download_path,
-        'format': 'best',
-        'cookiefile': temp_cookie_path if temp_cookie_path else None,
-        'writethumbnail': True,
-        'verbose': True,
-    }
-    
-    progress_message = await event.reply("**__Starting download...__**")
-    logger.info("Starting the download process...")
-    
     try:
+        # Admitted inside the try so the finally always returns the slot
+        job = scratch.admit(event.sender_id)
+
+        random_filename = get_random_string() + ".mp4"
+        download_path = job.file(random_filename)
+        logger.info(f"Generated random download path: {download_path}")
+
+        if cookies:
+            with tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.txt') as temp_cookie_file:
+                temp_cookie_file.write(cookies)
+                temp_cookie_path = temp_cookie_file.name
+            logger.info(f"Created temporary cookie file at: {temp_cookie_path}")
+
+        ydl_opts = {
+            'outtmpl': download_path,
+            'format': 'best',
+            'cookiefile': temp_cookie_path if temp_cookie_path else None,
+            'writethumbnail': True,
+            'quiet': True,
+            'noprogress': True,
+            'logger': logging.getLogger("yt_dlp"),
+        }
+
+        progress_message = await event.reply("**__Starting download...__**")
+        logger.info("Starting the download process...")
+
         info_dict = await fetch_video_info(url, ydl_opts, progress_message, check_duration_and_size)
         if not info_dict:
             return
-            
+
+        # The job was admitted before the size was known
+        scratch.grow(job, int(info_dict.get('filesize') or info_dict.get('filesize_approx') or 0))
         await asyncio.to_thread(download_video, url, ydl_opts)
         title = info_dict.get('title', 'Powered by Shimperd')
         
@@ -107,7 +115,7 @@ async def process_video(client, event, url, cookies_env_var, check_duration_and_
         # Handle thumbnail
         thumbnail_url = info_dict.get('thumbnail')
         if thumbnail_url:
-            thumb_path = os.path.join(tempfile.gettempdir(), get_random_string() + ".jpg")
+            thumb_path = job.file(get_random_string() + ".jpg")
             thumbnail_file = d_thumbnail(thumbnail_url, thumb_path)
             if thumbnail_file:
                 logger.info(f"Thumbnail saved at: {thumbnail_file}")
@@ -153,6 +161,8 @@ async def process_video(client, event, url, cookies_env_var, check_duration_and_
         else:
             await event.reply("**__File not found after download. Something went wrong!__**")
             
+    except ScratchFull as e:
+        await event.reply(f"**__{e}__**")
     except Exception as e:
         logger.exception("An error occurred during download or upload.")
         await event.reply(f"**__An error occurred: {e}__**")
@@ -164,6 +174,8 @@ async def process_video(client, event, url, cookies_env_var, check_duration_and_
                     os.remove(file_path)
                 except Exception as e:
                     logger.error(f"Error removing file {file_path}: {e}")
+        if job:
+            scratch.release(job)
 
 async def split_and_upload_file(app, sender, file, caption):
     if not os.path.exists(file):
@@ -175,6 +187,7 @@ async def split_and_upload_file(app, sender, file, caption):
     PART_SIZE = 1.9 * 1024 * 1024 * 1024
 
     part_number = 0
+    job = scratch.owner(file)
     async with aiofiles.open(file, mode="rb") as f:
         while True:
             chunk = await f.read(PART_SIZE)
@@ -184,6 +197,8 @@ async def split_and_upload_file(app, sender, file, caption):
             base_name, file_ext = os.path.splitext(file)
             part_file = f"{base_name}.part{str(part_number).zfill(3)}{file_ext}"
 
+            # Parts sit next to the file, so they count against its scratch job
+            scratch.grow(job, len(chunk))
             async with aiofiles.open(part_file, mode="wb") as part_f:
                 await part_f.write(chunk)
 
@@ -204,6 +219,7 @@ async def split_and_upload_file(app, sender, file, caption):
             
             await edit.delete()
             os.remove(part_file)
+            scratch.shrink(job, len(chunk))
             part_number += 1
 
     await start.delete()